@@ -0,0 +1,119 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+import loader
+import stellar_network as sn
+
+"""
+This file contains a batch mode that checks the intertwinedness of many snapshots of the network, such as archived stellarbeat dumps.
+Each worker process keeps the last network it checked and a memo of closure axioms keyed by QSet, so consecutive snapshots only encode the qsets that changed.
+The memo only keeps the qsets of the last snapshot, and worker processes are replaced after SNAPSHOTS_PER_PROCESS snapshots, since pysmt keeps every term it has built until the process exits.
+
+Usage: python3 batch.py DIRECTORY [--workers N] [--output FILE]
+"""
+
+# The columns of the results table
+FIELDS = ['snapshot', 'validators', 'qsets', 'intertwined', 'load_seconds', 'check_seconds', 'error']
+
+# The largest number of snapshots checked by a worker process before it is replaced by a fresh one
+SNAPSHOTS_PER_PROCESS = 64
+
+def snapshot_paths(directory):
+    """
+    Return the paths of the JSON files in directory, sorted by name (i.e. by date, for timestamped dumps).
+    """
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.json')]
+
+class SnapshotChecker:
+    """
+    Checks snapshots one after the other, sharing what it can between them.
+
+    :ivar previous: the last network checked, whose ids are reused by the next one
+    :ivar lhs_memo: the memo of closure axioms shared by all the networks (see StellarNetwork.closed_ax), restricted to the qsets of the last network after each check
+    :ivar interned: the QSets of the snapshots, mapped to themselves (see loader.iter_validators), likewise restricted
+    """
+
+    def __init__(self):
+        self.previous = None
+        self.lhs_memo = dict()
+        # hash-consing QSets across snapshots makes the memo lookups cheap and the snapshots share memory
+        self.interned = dict()
+
+    def check(self, path):
+        """
+        Check the snapshot in the file at path.
+
+        :return: a dictionary with the keys of FIELDS; a snapshot that cannot be loaded or is not a valid network gets an error instead of a verdict
+        """
+        result = dict([(field, None) for field in FIELDS])
+        result['snapshot'] = os.path.basename(path)
+        try:
+            start = time.perf_counter()
+            with open(path, 'r') as f:
+                validators = list(loader.iter_validators(f, self.interned))
+            network = sn.StellarNetwork(validators, previous=self.previous, lhs_memo=self.lhs_memo)
+            result['load_seconds'] = time.perf_counter() - start
+            result['validators'] = len(network.validators)
+            result['qsets'] = len(network.qset_ids)
+
+            start = time.perf_counter()
+            result['intertwined'] = network.check_network_intertwined()
+            result['check_seconds'] = time.perf_counter() - start
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            result['error'] = "{}: {}".format(type(e).__name__, e)
+            return result
+        self.previous = network
+        # qsets that disappeared are rarely seen again, so forgetting them keeps the memory used bounded by the size of a snapshot
+        for memo in [self.lhs_memo, self.interned]:
+            for qset in [qset for qset in memo if qset not in network.qset_ids]:
+                del memo[qset]
+        return result
+
+# The checker of a worker process
+_worker_checker = None
+
+def _check_snapshot(path):
+    global _worker_checker
+    if _worker_checker is None:
+        _worker_checker = SnapshotChecker()
+    return _worker_checker.check(path)
+
+def check_snapshots(paths, max_workers=None):
+    """
+    Check the snapshots at paths, and yield their results (see SnapshotChecker.check) in the same order.
+
+    :param max_workers: if not None, check the snapshots on a pool of that many processes; each process gets a run of at most SNAPSHOTS_PER_PROCESS consecutive snapshots, which are likely to share most of their qsets, and then exits
+    """
+    if max_workers is None:
+        checker = SnapshotChecker()
+        for path in paths:
+            yield checker.check(path)
+        return
+    chunk_size = min(SNAPSHOTS_PER_PROCESS, max(1, len(paths) // (4*max_workers)))
+    # a chunk is a single task, so each process checks a single run of snapshots, and the pysmt terms it built are freed when it exits
+    with multiprocessing.Pool(max_workers, maxtasksperchild=1) as pool:
+        yield from pool.imap(_check_snapshot, paths, chunk_size)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Check whether each snapshot of the Stellar network in a directory is intertwined.")
+    parser.add_argument('directory', help="directory of JSON files, each listing the nodes of a snapshot in the format of validators.json or of stellarbeat")
+    parser.add_argument('--workers', type=int, help="number of worker processes (default: check the snapshots in this process)")
+    parser.add_argument('--output', help="file to which the results are written, as CSV (default: standard output)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        for result in check_snapshots(snapshot_paths(args.directory), args.workers):
+            writer.writerow(result)
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+import batch
+import json
+import os
+import stellar_network
+import tempfile
+import unittest
+from benchmarks import generators
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        snapshots = {
+            '1.json' : generators.tiered(4, watchers=2),
+            '2.json' : generators.tiered(4, watchers=3),
+            '3.json' : generators.split_tiered(4),
+            '4.json' : [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}}],
+        }
+        for name, validators in snapshots.items():
+            with open(os.path.join(self.directory.name, name), 'w') as f:
+                json.dump(validators, f)
+        with open(os.path.join(self.directory.name, 'notes.txt'), 'w') as f:
+            f.write("not a snapshot")
+        self.paths = batch.snapshot_paths(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_check_snapshots(self):
+        self.assertEqual([os.path.basename(path) for path in self.paths], ['1.json', '2.json', '3.json', '4.json'])
+        for max_workers in [None, 2]:
+            results = list(batch.check_snapshots(self.paths, max_workers))
+            self.assertEqual([result['intertwined'] for result in results], [True, True, False, None])
+            self.assertEqual(results[0]['validators'], 14)
+            self.assertIsNone(results[0]['error'])
+            self.assertIn("Unknown validator", results[3]['error'])
+
+    def test_bounded_memo(self):
+        checker = batch.SnapshotChecker()
+        checker.check(self.paths[0])
+        checker.check(self.paths[2])
+        first = set(stellar_network.StellarNetwork(generators.tiered(4, watchers=2)).qset_ids)
+        last = set(checker.previous.qset_ids)
+        self.assertTrue(first - last)
+        # only the qsets of the last snapshot are kept
+        for memo in [checker.lhs_memo, checker.interned]:
+            self.assertLessEqual(set(memo), last)
+
+    def test_sharing(self):
+        lhs_memo = dict()
+        first = stellar_network.StellarNetwork(generators.tiered(4, watchers=2), lhs_memo=lhs_memo)
+        self.assertTrue(first.check_network_intertwined())
+        # the core qset and the organizations are unchanged, so their closure axioms are reused without a previous network
+        second = stellar_network.StellarNetwork(generators.tiered(4, watchers=3), lhs_memo=lhs_memo)
+        self.assertEqual(len(second.lhs_cache), 5)
+        self.assertTrue(second.check_network_intertwined())
+        # the memo is only used with the same threshold encoding
+        third = stellar_network.StellarNetwork(generators.tiered(4, watchers=3), threshold_encoding='combinations', lhs_memo=lhs_memo)
+        self.assertEqual(len(third.lhs_cache), 0)
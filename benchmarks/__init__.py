@@ -0,0 +1,4 @@
+"""
+Benchmarks of the intertwinedness check on synthetic networks.
+Run them from the root of the repository with `python3 -m benchmarks.run`.
+"""
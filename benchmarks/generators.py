@@ -0,0 +1,63 @@
+import random
+
+"""
+Generators of synthetic Stellar-like networks.
+Each generator returns a list of validators in the form accepted by StellarNetwork.__init__.
+"""
+
+def qset(threshold, validators, innerQuorumSets=[]):
+    return {'threshold' : threshold, 'validators' : list(validators), 'innerQuorumSets' : list(innerQuorumSets)}
+
+def names(prefix, n):
+    return ["{}{}".format(prefix, i) for i in range(n)]
+
+def symmetric_core(n, threshold=None):
+    """
+    n validators that all have the same flat quorumSet over all of them.
+    The network is intertwined iff 2*threshold > n.
+
+    :param threshold: defaults to the smallest intertwined threshold, n//2+1
+    """
+    threshold = n//2+1 if threshold is None else threshold
+    core = names("V", n)
+    return [{'publicKey' : v, 'quorumSet' : qset(threshold, core)} for v in core]
+
+def tiered(orgs, validators_per_org=3, watchers=0, seed=0):
+    """
+    A core of orgs organizations, each running validators_per_org validators, like the tier-one organizations of Stellar.
+    Core validators require a 2/3 majority of organizations, each organization being a nested qset requiring a majority of its validators.
+    The watchers are validators outside the core that trust a random majority of the organizations and are not trusted back.
+    The network is intertwined.
+    """
+    rng = random.Random(seed)
+    org_qsets = [qset(validators_per_org//2+1, names("O{}V".format(o), validators_per_org)) for o in range(orgs)]
+    core_qset = qset(2*orgs//3+1, [], org_qsets)
+    validators = [{'publicKey' : v, 'quorumSet' : core_qset} for q in org_qsets for v in q['validators']]
+    for w in names("W", watchers):
+        trusted = rng.sample(org_qsets, orgs//2+1)
+        validators.append({'publicKey' : w, 'quorumSet' : qset(len(trusted)//2+1, [], trusted)})
+    return validators
+
+def split(n, threshold=None):
+    """
+    Two symmetric cores of n validators each that do not trust each other, so the network is not intertwined.
+    """
+    first = symmetric_core(n, threshold)
+    second = [{'publicKey' : 'X' + v['publicKey'],
+               'quorumSet' : qset(v['quorumSet']['threshold'], ['X' + w for w in v['quorumSet']['validators']])}
+              for v in first]
+    return first + second
+
+def split_tiered(orgs, validators_per_org=3, seed=0):
+    """
+    A tiered network where one organization only trusts itself, so it forms a quorum disjoint from the quorums of the other organizations.
+
+    :param orgs: at least 4, so that the other organizations have enough of a majority without the rogue one
+    """
+    assert orgs >= 4
+    validators = tiered(orgs, validators_per_org, seed=seed)
+    rogue = names("O0V", validators_per_org)
+    for v in validators:
+        if v['publicKey'] in rogue:
+            v['quorumSet'] = qset(validators_per_org//2+1, rogue)
+    return validators
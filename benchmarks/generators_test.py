@@ -0,0 +1,23 @@
+from benchmarks import generators
+from benchmarks import run
+import stellar_network
+import unittest
+
+class TestGenerators(unittest.TestCase):
+    def test_networks(self):
+        """
+        The generated networks are accepted by StellarNetwork and have the expected verdicts, with and without decomposition.
+        """
+        for name, parameters, expected in run.suite(quick=True):
+            validators = getattr(generators, name)(**parameters)
+            network = stellar_network.StellarNetwork(validators)
+            self.assertEqual(len(network.validators), len(validators))
+            for decompose in [True, False]:
+                self.assertEqual(run.run(name, parameters, decompose=decompose)['intertwined'], expected)
+
+    def test_tiered(self):
+        network = stellar_network.StellarNetwork(generators.tiered(4, validators_per_org=3, watchers=2))
+        self.assertEqual(len(network.validators), 14)
+        # the core qset, its 4 organizations, and at most 2 watcher qsets
+        self.assertLessEqual(len(network.qset_ids), 7)
+        self.assertEqual(len(network.quorum_bearing_components()), 1)
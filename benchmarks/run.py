@@ -0,0 +1,110 @@
+import argparse
+import json
+import sys
+import time
+import stellar_network as sn
+import three_valued_logic as tvl
+from benchmarks import generators
+
+"""
+Times the phases of the intertwinedness check on synthetic networks of growing size, and writes one JSON object per run.
+
+Usage: python3 -m benchmarks.run [--quick] [--no-decompose] [--no-precheck] [--output FILE]
+"""
+
+# Networks with two quorum-bearing components, which decomposition answers without encoding anything; they are always run without decomposition, so that they time the precheck, or with --no-precheck the encoding and the solver
+NOT_DECOMPOSED = {'split', 'split_tiered'}
+
+def suite(quick=False):
+    """
+    Yield triples (name, parameters, expected verdict) of networks to benchmark.
+    """
+    sizes = [4, 8] if quick else [4, 8, 16, 32]
+    for n in sizes:
+        yield 'symmetric_core', {'n' : n}, True
+        yield 'symmetric_core', {'n' : n, 'threshold' : n//2}, False
+        yield 'split', {'n' : n}, False
+    for orgs in ([4, 7] if quick else [4, 7, 10, 13]):
+        yield 'tiered', {'orgs' : orgs, 'watchers' : 2*orgs}, True
+        yield 'split_tiered', {'orgs' : orgs}, False
+
+def run(name, parameters, threshold_encoding='counter', decompose=True, precheck=True):
+    """
+    Generate the network and check it, timing each phase separately: 'closed_ax' builds closedAx, 'build_goal' builds the rest of the formula of network_intertwined (the intertwined(p,q) goals), and 'encode_clauses' turns the formula into clauses with the ClauseEncoder.
+
+    :return: a dictionary describing the run
+    """
+    validators = getattr(generators, name)(**parameters)
+    result = {'benchmark' : name, 'parameters' : parameters, 'threshold_encoding' : threshold_encoding, 'decompose' : decompose, 'precheck' : precheck}
+    times = result['seconds'] = {}
+
+    start = time.perf_counter()
+    network = sn.StellarNetwork(validators, threshold_encoding=threshold_encoding)
+    times['parse'] = time.perf_counter() - start
+    result['validators'] = len(network.validators)
+    result['qsets'] = len(network.qset_ids)
+
+    restrict_to = None
+    if decompose:
+        start = time.perf_counter()
+        components = network.quorum_bearing_components()
+        times['decompose'] = time.perf_counter() - start
+        if len(components) != 1:
+            result['intertwined'] = len(components) == 0
+            return result
+        restrict_to = components[0]
+
+    if precheck:
+        start = time.perf_counter()
+        disjoint_quorums = network.find_disjoint_quorums(restrict_to)
+        times['precheck'] = time.perf_counter() - start
+        if disjoint_quorums is not None:
+            result['intertwined'] = False
+            return result
+
+    start = time.perf_counter()
+    network.closed_ax(restrict_to)
+    times['closed_ax'] = time.perf_counter() - start
+
+    # pysmt terms are hash-consed, so the closedAx built again by network_intertwined is only looked up, and build_goal mostly times the goals
+    start = time.perf_counter()
+    formula = network.network_intertwined(restrict_to)
+    times['build_goal'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoder = tvl.ClauseEncoder()
+    encoder.encode(formula)
+    dimacs = encoder.to_dimacs([[-encoder.tb(formula)]])
+    times['encode_clauses'] = time.perf_counter() - start
+    result['variables'] = encoder.num_vars
+    result['clauses'] = encoder.num_clauses + 1
+
+    start = time.perf_counter()
+    result['intertwined'] = not tvl.solve_dimacs(dimacs)
+    times['solve'] = time.perf_counter() - start
+    return result
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the intertwinedness check on synthetic networks.")
+    parser.add_argument('--quick', action='store_true', help="only run the smallest sizes")
+    parser.add_argument('--no-decompose', action='store_true', help="encode the whole network instead of its quorum-bearing component")
+    parser.add_argument('--no-precheck', action='store_true', help="do not look for disjoint quorums without SAT first")
+    parser.add_argument('--threshold-encoding', default='counter', choices=['counter', 'combinations'])
+    parser.add_argument('--output', help="file to which results are appended, as JSON lines (default: standard output)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for name, parameters, expected in suite(args.quick):
+            decompose = not args.no_decompose and name not in NOT_DECOMPOSED
+            result = run(name, parameters, args.threshold_encoding, decompose, not args.no_precheck)
+            if result['intertwined'] != expected:
+                raise AssertionError("Wrong verdict for {} {}".format(name, parameters))
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,120 @@
+import os
+import time
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+"""
+This file contains budgets bounding the wall-clock time and the memory of checks.
+A check that runs out of budget answers UNKNOWN instead of True or False.
+"""
+
+class Unknown:
+    """
+    The type of UNKNOWN.
+    UNKNOWN is neither true nor false, so using it as a boolean raises TypeError instead of silently counting as a negative answer; compare answers with `is`.
+    """
+
+    def __bool__(self):
+        raise TypeError("UNKNOWN is neither true nor false; compare it with `is`")
+
+    def __repr__(self):
+        return 'UNKNOWN'
+
+    def __reduce__(self):
+        # unpickling gives back the module's UNKNOWN, so that `is` comparisons work across processes
+        return 'UNKNOWN'
+
+# The answer of a check that ran out of budget
+UNKNOWN = Unknown()
+
+# The largest value of the timeout and max_memory parameters of z3, which means no limit
+Z3_UNLIMITED = 4294967295
+
+def memory_mb(peak=False):
+    """
+    Return the resident memory of the process in megabytes or, if peak is True or the current one is not available, its peak resident memory; None if neither is available.
+    This is the only place where memory is measured, for budgets and for profiles (see instrumentation).
+    """
+    if not peak:
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+        except (OSError, ValueError, IndexError):
+            pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+class BudgetExceeded(Exception):
+    """
+    Raised by Budget.check inside long computations (e.g. encodings), and turned into UNKNOWN by the functions that take a budget.
+    """
+
+class Budget:
+    """
+    A deadline and a memory cap, shared by all the queries of a check.
+    Time is counted from the creation of the budget.
+
+    :ivar deadline: the time.monotonic() at which the budget runs out, or None for no time limit
+    :ivar memory_mb: the memory that the process and the solvers it runs may use, in megabytes, or None for no memory limit
+    """
+
+    def __init__(self, seconds=None, memory_mb=None):
+        """
+        :param seconds: the wall-clock time available, or None
+        :param memory_mb: see memory_mb
+        """
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.memory_mb = memory_mb
+
+    def remaining(self):
+        """
+        Return the number of seconds left, or None if there is no time limit.
+        """
+        if self.deadline is None:
+            return None
+        return max(0, self.deadline - time.monotonic())
+
+    def expired(self):
+        """
+        Return True iff the time is up, or the process uses more memory than allowed.
+        """
+        if self.remaining() == 0:
+            return True
+        if self.memory_mb is None:
+            return False
+        memory = memory_mb()
+        return memory is not None and memory > self.memory_mb
+
+    def check(self):
+        """
+        Raise BudgetExceeded if the budget has run out.
+        """
+        if self.expired():
+            raise BudgetExceeded()
+
+    def share(self, fraction):
+        """
+        Return a budget with the given fraction of the time left, and the same memory cap.
+        """
+        remaining = self.remaining()
+        return Budget(None if remaining is None else fraction*remaining, self.memory_mb)
+
+    def z3_params(self):
+        """
+        Return the parameters that make a z3 solver give up (and answer unknown) when the budget runs out.
+        """
+        remaining = self.remaining()
+        return {'timeout' : Z3_UNLIMITED if remaining is None else max(1, int(1000*remaining)),
+                'max_memory' : Z3_UNLIMITED if self.memory_mb is None else int(self.memory_mb)}
+
+    def limit_memory(self):
+        """
+        Limit the address space of the current process to memory_mb, if set; used in solver subprocesses before they start.
+        """
+        if resource is not None and self.memory_mb is not None:
+            limit = int(self.memory_mb * 2**20)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
@@ -0,0 +1,32 @@
+import budgets
+import pickle
+import unittest
+
+class TestBudget(unittest.TestCase):
+    def test_time(self):
+        budget = budgets.Budget(10)
+        self.assertTrue(0 < budget.remaining() <= 10)
+        self.assertFalse(budget.expired())
+        self.assertTrue(budget.share(0.5).remaining() <= 5)
+        self.assertTrue(budgets.Budget(0).expired())
+        self.assertIsNone(budgets.Budget().remaining())
+        self.assertFalse(budgets.Budget().expired())
+
+    def test_memory(self):
+        self.assertTrue(budgets.memory_mb() > 0)
+        self.assertTrue(budgets.Budget(memory_mb=1).expired())
+        self.assertFalse(budgets.Budget(memory_mb=2**20).expired())
+
+    def test_z3_params(self):
+        self.assertEqual(budgets.Budget().z3_params(), {'timeout' : budgets.Z3_UNLIMITED, 'max_memory' : budgets.Z3_UNLIMITED})
+        params = budgets.Budget(2, 100).z3_params()
+        self.assertTrue(1000 < params['timeout'] <= 2000)
+        self.assertEqual(params['max_memory'], 100)
+        self.assertEqual(budgets.Budget(0).z3_params()['timeout'], 1)
+
+    def test_unknown(self):
+        self.assertIsNot(budgets.UNKNOWN, None)
+        self.assertIs(pickle.loads(pickle.dumps(budgets.UNKNOWN)), budgets.UNKNOWN)
+        with self.assertRaises(TypeError):
+            bool(budgets.UNKNOWN)
+
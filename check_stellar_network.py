@@ -1,68 +1,210 @@
 # get json data from https://api.stellarbeat.io/v1/node-snapshots
 
-import requests
+import argparse
+import io
 import json
-import stellar_network as sn
 import sys
+import loader
+import solvers
+
+"""
+Command-line interface.
+
+Usage: python3 check_stellar_network.py [check|stats|pair|update] [options]
+Without a subcommand, the network is checked, as by the check subcommand.
+Heavy modules (requests, pysmt, z3) are only imported by the subcommands that need them, so that stats and usage messages start fast.
+"""
 
 def get_config_from_stellarbeat():
     """
-    Get data from stellarbeat, filter it, and return it as a list of dictionaries
+    Get data from stellarbeat, filter it, and return it as a list of dictionaries.
+    The response is parsed as it is downloaded, keeping only the validators and their quorumSets.
+    Exits with an error message if stellarbeat does not answer with the data.
     """
+    import requests
     url = "https://api.stellarbeat.io/v1/node"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        filtered_data = [{'publicKey': node['publicKey'], 'quorumSet': node['quorumSet']}
-            for node in data if node['isValidator'] == True]
-        return filtered_data
-    else:
-        print("Error: Could not retrieve data from URL")
+    response = requests.get(url, stream=True)
+    if response.status_code != 200:
+        raise SystemExit("Error: Could not retrieve data from {} (HTTP status {})".format(url, response.status_code))
+    # let urllib3 undo any gzip transfer encoding
+    response.raw.decode_content = True
+    with io.TextIOWrapper(response.raw, encoding='utf-8') as f:
+        return list(loader.iter_validators(f))
+
+def save_validators(validators, path='validators.json'):
+    with open(path, 'w') as f:
+        json.dump([{'publicKey': validator['publicKey'], 'quorumSet': validator['quorumSet'].to_json()}
+                   for validator in validators], f)
 
-def get_validators(update=False):
+def get_validators(update=False, path='validators.json'):
     """
     If update is False, loads data from validatos.json if possible, and otherwise from stellarbeat.
     Otherwise, loads data from stellarbeat and saves it to validators.json
     """
     if update:
-        print("Updating validators.json")
+        print("Updating {}".format(path))
         validators = get_config_from_stellarbeat()
-        with open('validators.json', 'w') as f:
-            json.dump(validators, f)
+        save_validators(validators, path)
     else:
         try:
-            with open('validators.json', 'r') as f:
-                validators = json.load(f)
+            validators = loader.load_validators(path)
         except FileNotFoundError:
             validators = get_config_from_stellarbeat()
-            with open('validators.json', 'w') as f:
-                json.dump(validators, f)
+            save_validators(validators, path)
     return validators
 
-# if no arguments were given, then load data from validators.json if possible, and otherwise from stellarbeat
-# otherwise, if the first argument is '--update', then load data from stellarbeat and save it to validators.json
-if len(sys.argv) > 1:
-    if sys.argv[1] == '--update':
-        validators = get_validators(update=True)
+def get_budget(args):
+    """
+    Return the budget set by --timeout and --max-memory, or None.
+    """
+    if args.timeout is None and args.max_memory is None:
+        return None
+    import budgets
+    return budgets.Budget(args.timeout, args.max_memory)
+
+def get_network(args, validators):
+    import stellar_network as sn
+    return sn.StellarNetwork(validators, solver=solvers.backend(args.solver) if args.solver else None)
+
+def stats(args):
+    """
+    Print the number of validators and qsets, without loading the solving machinery.
+    """
+    validators = get_validators(path=args.validators)
+    qsets = set([validator['quorumSet'] for validator in validators])
+    all_qsets = set()
+    stack = list(qsets)
+    while stack:
+        qset = stack.pop()
+        if qset not in all_qsets:
+            all_qsets.add(qset)
+            stack.extend(qset.innerQuorumSets)
+    print("There are {} validators".format(len(validators)))
+    print("There are {} different qsets".format(len(qsets)))
+    print("There are {} different qsets, including inner qsets".format(len(all_qsets)))
+
+def update(args):
+    validators = get_validators(update=True, path=args.validators)
+    print("Saved {} validators".format(len(validators)))
+
+def pair(args):
+    """
+    Check whether two validators are intertwined.
+    """
+    import budgets
+    budget = get_budget(args)
+    validators = get_validators(path=args.validators)
+    stellar_network = get_network(args, validators)
+    for pk in [args.p, args.q]:
+        if pk not in stellar_network.validators:
+            raise SystemExit("Unknown validator: {}".format(pk))
+    intertwined = stellar_network.check_intertwined(args.p, args.q, budget)
+    print("Are {} and {} intertwined? {}"
+          .format(args.p, args.q, 'unknown' if intertwined is budgets.UNKNOWN else intertwined))
+
+def check(args):
+    import budgets
+    import instrumentation
+    import network_cache
+    budget = get_budget(args)
+
+    if args.profile:
+        profile = instrumentation.start()
+
+    with instrumentation.phase('load'):
+        if args.update:
+            validators = get_validators(update=True, path=args.validators)
+        else:
+            print("Loading data from {}. Use --update to get fresh data from stellarbeat.".format(args.validators))
+            validators = get_validators(path=args.validators)
+
+    print("There are {} validators".format(len(validators)))
+    print("There are {} different qsets".format(len(set([validator['quorumSet'] for validator in validators]))))
+
+    # the cache is looked up before building the network, so that a hit does not load pysmt
+    # (it is not used with a budget, since a partial result cannot be cached)
+    cache = key = entry = None
+    qsets = dict([(validator['publicKey'], validator['quorumSet']) for validator in validators])
+    # with duplicate validators, StellarNetwork reports the error
+    if budget is None and not args.no_cache and len(qsets) == len(validators):
+        with instrumentation.phase('cache'):
+            cache = network_cache.VerdictCache('.tvl_cache')
+            key = cache.key(qsets)
+            entry = cache.get(key)
+
+    stellar_network = None
+    if entry is None or args.dimacs:
+        stellar_network = get_network(args, validators)
+    if args.dimacs:
+        with open(args.dimacs, 'w') as f:
+            f.write(stellar_network.intertwined_dimacs())
+
+    # each way of checking gets the verdict and, if it is negative, a counterexample from a single solver call
+    if entry is not None:
+        intertwined, counterexample = entry
+    elif budget is not None:
+        result = stellar_network.check_network_intertwined_within(budget)
+        intertwined, counterexample = result.intertwined, result.counterexample
+        if result.intertwined_pairs or result.undecided_pairs:
+            print("Out of budget for the full check; checked pairs one by one: {} intertwined, {} undecided"
+                  .format(len(result.intertwined_pairs), len(result.undecided_pairs)))
+        if result.non_intertwined_pair:
+            print("{} and {} are not intertwined".format(*result.non_intertwined_pair))
     else:
-        print("Usage: python3 check_stellar_network.py [--update]")
-        sys.exit(1)
-else:
-    print("Loading data from validators.json. Use --update to get fresh data from stellarbeat.")
-    validators = get_validators()
-
-stellar_network = sn.StellarNetwork(validators)
-print("There are {} validators".format(len(stellar_network.validators)))
-print("There are {} different qsets".format(len(stellar_network.qsets)))
-# for qset in stellar_network.qsets:
-#     print("{}\n".format(qset))
-
-# import cProfile
-# cProfile.run('stellar_network.check_network_intertwined()', 'restats')
-# import pstats
-# from pstats import SortKey
-# p = pstats.Stats('restats')
-# p.strip_dirs().sort_stats(SortKey.CUMULATIVE).print_stats(20)
-
-print("Is the Stellar network interwined? {}"
-      .format(stellar_network.check_network_intertwined()))
\ No newline at end of file
+        intertwined, counterexample = stellar_network.find_counterexample()
+        if cache is not None:
+            with instrumentation.phase('cache'):
+                cache.put(key, intertwined, counterexample)
+    print("Is the Stellar network interwined? {}"
+          .format('unknown' if intertwined is budgets.UNKNOWN else intertwined))
+    if counterexample is not None:
+        print("{} and {} are not intertwined: they belong to the disjoint quorums {{{}}} and {{{}}}"
+              .format(*counterexample.pair, *[", ".join(sorted(quorum)) for quorum in counterexample.quorums]))
+    if stellar_network is not None and isinstance(stellar_network.solver, solvers.Portfolio) and stellar_network.solver.last_winner:
+        print("Answered by {}".format(stellar_network.solver.last_winner))
+
+    if args.profile == 'text':
+        print(profile.to_text())
+    elif args.profile == 'json':
+        print(profile.to_json())
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Check whether the Stellar network is intertwined.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # options shared by all subcommands
+    data = argparse.ArgumentParser(add_help=False)
+    data.add_argument('--validators', default='validators.json', help="the file holding the validators, fetched from stellarbeat if it does not exist (default: validators.json)")
+    # options of the subcommands that solve
+    solving = argparse.ArgumentParser(add_help=False)
+    solving.add_argument('--solver', help="SAT backend: 'z3-api' (the default), one of {}, or a comma-separated list of them to race them".format(', '.join(solvers.COMMANDS)))
+    solving.add_argument('--timeout', type=float, help="give up after this many seconds, answering unknown, or reporting which pairs of validators could be checked")
+    solving.add_argument('--max-memory', type=int, help="give up when the process or a solver uses more than this many megabytes")
+
+    check_parser = subparsers.add_parser('check', parents=[data, solving], help="check whether the network is intertwined (the default)")
+    # without --update, load data from validators.json if possible, and otherwise from stellarbeat
+    check_parser.add_argument('--update', action='store_true', help="get fresh data from stellarbeat and save it to validators.json")
+    check_parser.add_argument('--no-cache', action='store_true', help="do not use the cache of verdicts in .tvl_cache/")
+    check_parser.add_argument('--dimacs', help="write the SAT instance to this file, in DIMACS format; it is unsatisfiable iff the network is intertwined")
+    check_parser.add_argument('--profile', choices=['text', 'json'], help="report the time spent in each phase, the size of the SAT instance and the peak memory, as text or as a line of JSON")
+    check_parser.set_defaults(run=check)
+
+    stats_parser = subparsers.add_parser('stats', parents=[data], help="count the validators and qsets")
+    stats_parser.set_defaults(run=stats)
+
+    pair_parser = subparsers.add_parser('pair', parents=[data, solving], help="check whether two validators are intertwined")
+    pair_parser.add_argument('p', help="the public key of a validator")
+    pair_parser.add_argument('q', help="the public key of a validator")
+    pair_parser.set_defaults(run=pair)
+
+    update_parser = subparsers.add_parser('update', parents=[data], help="get fresh data from stellarbeat and save it")
+    update_parser.set_defaults(run=update)
+
+    # the options of check can be given without the subcommand, as before subcommands existed
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['check'] + list(argv)
+    args = parser.parse_args(argv)
+    args.run(args)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
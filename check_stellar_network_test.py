@@ -0,0 +1,92 @@
+import check_stellar_network
+import contextlib
+import io
+import json
+import os
+import subprocess
+import solvers
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks import generators
+
+class TestCommandLine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'validators.json')
+        with open(self.path, 'w') as f:
+            json.dump(generators.symmetric_core(4), f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_main(self, argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            check_stellar_network.main(argv + ['--validators', self.path])
+        return out.getvalue()
+
+    def test_stats(self):
+        self.assertIn("There are 4 validators", self.run_main(['stats']))
+        # stats does not load pysmt, nor requests
+        script = "import check_stellar_network, sys; check_stellar_network.main(['stats', '--validators', {!r}]); print(sorted(m for m in sys.modules if m.split('.')[0] in ('pysmt', 'requests', 'z3')))".format(self.path)
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(check_stellar_network.__file__))).stdout
+        self.assertTrue(output.endswith("[]\n"))
+
+    def test_check(self):
+        self.assertIn("interwined? True", self.run_main(['check', '--no-cache']))
+        # check is the default subcommand
+        self.assertIn("interwined? True", self.run_main(['--no-cache']))
+        self.assertIn("interwined? True", self.run_main(['--timeout', '60']))
+
+    def test_cache(self):
+        # the cache of verdicts is in the working directory, and a hit does not load pysmt
+        script = ("import check_stellar_network, sys; check_stellar_network.main(['check', '--validators', {!r}]); "
+                  "print(sorted(m for m in sys.modules if m.split('.')[0] in ('pysmt', 'z3', 'stellar_network')))").format(self.path)
+        environment = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(check_stellar_network.__file__)))
+        run = lambda: subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, cwd=self.directory.name, env=environment).stdout
+        with open(self.path, 'w') as f:
+            json.dump(generators.split(3), f)
+        first, second = run(), run()
+        self.assertFalse(first.endswith("[]\n"))
+        self.assertTrue(second.endswith("[]\n"))
+        self.assertIn("interwined? False", second)
+        # the counterexample is served from the cache too
+        self.assertEqual([line for line in first.splitlines() if "disjoint quorums" in line], [line for line in second.splitlines() if "disjoint quorums" in line])
+        self.assertIn("disjoint quorums", second)
+
+    def test_portfolio(self):
+        # a solver that answers with the z3 Python API, printing its model on 'v' lines, and one that never answers
+        script = os.path.join(self.directory.name, 'fake_solver.py')
+        with open(script, 'w') as f:
+            f.write("import sys, z3\n"
+                    "solver = z3.Solver()\n"
+                    "solver.from_string(open(sys.argv[1]).read())\n"
+                    "if solver.check() == z3.unsat:\n"
+                    "    print('s UNSATISFIABLE')\n"
+                    "else:\n"
+                    "    model = solver.model()\n"
+                    "    print('s SATISFIABLE')\n"
+                    "    print('v', ' '.join([d.name()[2:] for d in model.decls() if z3.is_true(model[d])]), '0')\n")
+        commands = {'fake': [sys.executable, script], 'stuck': [sys.executable, '-c', 'import time; time.sleep(60)']}
+        with mock.patch.dict(solvers.COMMANDS, commands):
+            output = self.run_main(['check', '--no-cache', '--solver', 'fake,stuck'])
+        self.assertIn("interwined? True", output)
+        self.assertIn("Answered by fake", output)
+
+    def test_update_error(self):
+        response = mock.Mock(status_code=503)
+        with mock.patch('requests.get', return_value=response):
+            with self.assertRaises(SystemExit) as raised:
+                self.run_main(['update'])
+        self.assertIn("503", str(raised.exception))
+        # the saved validators are left as they were
+        with open(self.path, 'r') as f:
+            self.assertEqual(json.load(f), generators.symmetric_core(4))
+
+    def test_pair(self):
+        self.assertIn("intertwined? True", self.run_main(['pair', 'V0', 'V1']))
+        with self.assertRaises(SystemExit):
+            self.run_main(['pair', 'V0', 'X'])
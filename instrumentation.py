@@ -0,0 +1,78 @@
+import budgets
+import contextlib
+import json
+import time
+
+"""
+This file contains timers and counters for the phases of a check.
+Phases are recorded only while a profile is active (see start), so the instrumentation costs almost nothing otherwise.
+"""
+
+class Profile:
+    """
+    :ivar seconds: a dictionary mapping the name of each phase to the total time spent in it
+    :ivar counters: a dictionary mapping names to counts (e.g. the number of variables of the SAT instance)
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.counters = {}
+
+    def peak_memory_kb(self):
+        """
+        Return the peak resident memory of the process in kilobytes, or None if it is not available (see budgets.memory_mb).
+        """
+        peak = budgets.memory_mb(peak=True)
+        return None if peak is None else int(peak * 2**10)
+
+    def to_dict(self):
+        return {'seconds' : self.seconds, 'counters' : self.counters, 'peak_memory_kb' : self.peak_memory_kb()}
+
+    def to_json(self):
+        """
+        Return the profile as a single line of JSON.
+        """
+        return json.dumps(self.to_dict())
+
+    def to_text(self):
+        lines = ["{:<20} {:>10.3f}s".format(name, seconds) for name, seconds in self.seconds.items()]
+        lines += ["{:<20} {:>11}".format(name, count) for name, count in self.counters.items()]
+        lines.append("{:<20} {:>9}kB".format('peak memory', self.peak_memory_kb()))
+        return "\n".join(lines)
+
+# The active profile, if any
+_current = None
+
+def start():
+    """
+    Start recording into a new profile, and return it.
+    """
+    global _current
+    _current = Profile()
+    return _current
+
+def stop():
+    global _current
+    _current = None
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Add the time spent in the with block to the phase called name, if a profile is active.
+    """
+    if _current is None:
+        yield
+        return
+    profile = _current
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.seconds[name] = profile.seconds.get(name, 0) + time.perf_counter() - start_time
+
+def count(name, n):
+    """
+    Add n to the counter called name, if a profile is active.
+    """
+    if _current is not None:
+        _current.counters[name] = _current.counters.get(name, 0) + n
@@ -0,0 +1,39 @@
+import instrumentation
+import io
+import json
+import loader
+import stellar_network
+import unittest
+
+class TestInstrumentation(unittest.TestCase):
+    def tearDown(self):
+        instrumentation.stop()
+
+    def test_inactive(self):
+        with instrumentation.phase('nothing'):
+            instrumentation.count('nothing', 1)
+        profile = instrumentation.start()
+        self.assertEqual(profile.seconds, {})
+        self.assertEqual(profile.counters, {})
+
+    def test_check(self):
+        profile = instrumentation.start()
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}])
+        self.assertTrue(network.check_network_intertwined())
+        for name in ['parse', 'sanity_check', 'intern', 'decompose', 'closed_ax', 'translation', 'solve']:
+            self.assertIn(name, profile.seconds)
+        self.assertEqual(profile.counters['variables'], 2*profile.counters['subformulas'])
+        self.assertGreater(profile.counters['constraints'], 0)
+        self.assertEqual(json.loads(profile.to_json())['counters'], profile.counters)
+        self.assertIn('closed_ax', profile.to_text())
+        self.assertGreater(profile.peak_memory_kb(), 0)
+
+    def test_load(self):
+        # the QSets built by the loader are timed as parsing
+        profile = instrumentation.start()
+        validators = list(loader.iter_validators(io.StringIO(json.dumps(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}]))))
+        self.assertEqual(len(validators), 1)
+        self.assertIn('parse', profile.seconds)
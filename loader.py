@@ -0,0 +1,88 @@
+import instrumentation
+import json
+from quorum_set import QSet
+
+"""
+This file contains a streaming loader for validator lists and stellarbeat node dumps.
+Records are parsed one at a time, only the public key and quorumSet of validators are kept, and identical quorumSets are shared, so memory stays proportional to the network rather than to the file.
+"""
+
+WHITESPACE = ' \t\r\n'
+# Characters that may follow an element of a JSON array
+DELIMITERS = WHITESPACE + ',]'
+# Characters that may continue a number
+NUMBER_CHARS = '0123456789+-.eE'
+# How close to the end of the buffer a decoding error must be to be blamed on a token cut by the end of a chunk; the longest such tokens are literals like -Infinity and \uXXXX escapes
+MAX_CUT_TOKEN = 16
+
+def iter_json_array(f, chunk_size=1<<16):
+    """
+    Yield the elements of the JSON array in the text file f one at a time, reading it in chunks.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+        elif buffer[pos] == ']':
+            return
+        elif buffer[pos] == ',':
+            pos += 1
+        else:
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                element, end = None, None
+                cut = e.msg.startswith('Unterminated string') or len(buffer) - e.pos <= MAX_CUT_TOKEN
+            if end is not None:
+                if (end < len(buffer) and buffer[end] in DELIMITERS) or (end == len(buffer) and eof):
+                    yield element
+                    pos = end
+                    continue
+                # an element followed by number characters (or by nothing yet) may be a prefix of a number
+                cut = all([c in NUMBER_CHARS for c in buffer[end:]])
+            # only an element cut by the end of the buffer may continue in the next chunk; reading on after any other error would read the rest of the file
+            if eof or not cut:
+                raise ValueError("Invalid JSON array element at position {}".format(pos))
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def iter_validators(f, interned=None, chunk_size=1<<16):
+    """
+    Yield the validators of a JSON array of node records, in the form accepted by StellarNetwork.__init__, with their quorumSet parsed into a QSet.
+    Records with an 'isValidator' field are skipped unless it is true; all other fields are dropped.
+    Building the QSets is timed as the 'parse' phase (see instrumentation).
+
+    :param interned: a dictionary in which QSets are hash-consed (see QSet.from_json); by default, a new one for this file
+    """
+    interned = dict() if interned is None else interned
+    for node in iter_json_array(f, chunk_size):
+        if node.get('isValidator', True):
+            with instrumentation.phase('parse'):
+                qset = QSet.from_json(node['quorumSet'], interned)
+            yield {'publicKey' : node['publicKey'], 'quorumSet' : qset}
+
+def load_validators(path, interned=None):
+    """
+    Return the list of validators in the file at path (see iter_validators).
+    """
+    with open(path, 'r') as f:
+        return list(iter_validators(f, interned))
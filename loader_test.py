@@ -0,0 +1,45 @@
+import io
+import json
+import loader
+import stellar_network
+import unittest
+
+NODES = [
+    {'publicKey' : 'A', 'isValidator' : True, 'name' : 'a', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B'], 'innerQuorumSets' : []}},
+    {'publicKey' : 'W', 'isValidator' : False, 'quorumSet' : None},
+    {'publicKey' : 'B', 'isValidator' : True, 'quorumSet' : {'threshold' : 2, 'validators' : ['B'], 'innerQuorumSets' : [
+        {'threshold' : 2, 'validators' : ['A','B'], 'innerQuorumSets' : []}]}},
+]
+
+class TestLoader(unittest.TestCase):
+    def test_iter_json_array(self):
+        text = json.dumps([1, 23456, "a, ]", {'x' : [1, 2]}, [], None, 7.5], indent=2)
+        for chunk_size in [1, 2, 3, 1000]:
+            self.assertEqual(list(loader.iter_json_array(io.StringIO(text), chunk_size)), json.loads(text))
+        self.assertEqual(list(loader.iter_json_array(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(ValueError):
+            list(loader.iter_json_array(io.StringIO("[1, 2x]")))
+        with self.assertRaises(ValueError):
+            list(loader.iter_json_array(io.StringIO("[1, {")))
+        with self.assertRaises(ValueError):
+            list(loader.iter_json_array(io.StringIO("{}")))
+        # tokens cut by the end of a chunk are completed by the next one
+        text = json.dumps([True, None, -1.5e3, "\u00e9\\", {'a' : False}], ensure_ascii=True)
+        for chunk_size in [1, 2, 3]:
+            self.assertEqual(list(loader.iter_json_array(io.StringIO(text), chunk_size)), json.loads(text))
+        # a malformed element in the middle of a file is reported without reading the rest of it
+        f = io.StringIO('[1, {"a" 1}, ' + '2, '*10000 + '3]')
+        with self.assertRaises(ValueError):
+            list(loader.iter_json_array(f, 64))
+        self.assertLessEqual(f.tell(), 2*64)
+        with self.assertRaises(ValueError):
+            list(loader.iter_json_array(io.StringIO('[1.x, 2]'), 2))
+
+    def test_iter_validators(self):
+        validators = list(loader.iter_validators(io.StringIO(json.dumps(NODES)), chunk_size=7))
+        self.assertEqual([v['publicKey'] for v in validators], ['A','B'])
+        self.assertEqual(set(validators[0].keys()), {'publicKey', 'quorumSet'})
+        # the qset of A is shared with the inner qset of B
+        self.assertIs(validators[0]['quorumSet'], next(iter(validators[1]['quorumSet'].innerQuorumSets)))
+        network = stellar_network.StellarNetwork(validators)
+        self.assertTrue(network.check_network_intertwined())
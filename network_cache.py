@@ -0,0 +1,102 @@
+import budgets
+import instrumentation
+import json
+import os
+import quorum_set
+
+"""
+This file contains an on-disk cache of the verdicts of intertwinedness checks.
+Entries are keyed by the content of the network and by the settings of the encoding, so checking an unchanged snapshot again does not encode nor solve anything.
+Keys and entries only depend on QSets, so the cache can be consulted before building a StellarNetwork, without loading pysmt.
+"""
+
+# Bump this when the encoding changes (e.g. its gates or the closure axioms) or the format of the entries, so that entries written by older code are not used anymore
+VERSION = 3
+
+class VerdictCache:
+    """
+    A directory holding, for each network, a file <key>.json with the verdict and, for networks that are not intertwined, the counterexample.
+    When the directory grows larger than max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=256*2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, validators, threshold_encoding='counter', translation='cnf'):
+        """
+        :param validators: a dictionary mapping public keys to QSets, such as StellarNetwork.validators
+        :param threshold_encoding: see StellarNetwork
+        :param translation: see StellarNetwork
+        """
+        return "{}-{}-{}-{}".format(VERSION, threshold_encoding, translation, quorum_set.content_hash(validators))
+
+    def path(self, key, extension):
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key):
+        """
+        Return the cached pair of the verdict and the Counterexample (None for an intertwined network), or None if there is none.
+        """
+        try:
+            with open(self.path(key, '.json'), 'r') as f:
+                entry = json.load(f)
+            verdict = entry['intertwined']
+            counterexample = entry['counterexample']
+            if counterexample is not None:
+                counterexample = quorum_set.Counterexample(tuple(counterexample['pair']), tuple([frozenset(quorum) for quorum in counterexample['quorums']]))
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None
+        if verdict is False and counterexample is None:
+            return None
+        # mark the entry as recently used
+        os.utime(self.path(key, '.json'))
+        return verdict, counterexample
+
+    def put(self, key, verdict, counterexample=None):
+        """
+        :param counterexample: the Counterexample of a network that is not intertwined; it is stored as the pair and the two quorums as sorted lists of public keys
+        """
+        if counterexample is not None:
+            counterexample = {'pair' : list(counterexample.pair), 'quorums' : [sorted(quorum) for quorum in counterexample.quorums]}
+        with open(self.path(key, '.json'), 'w') as f:
+            json.dump({'intertwined': verdict, 'counterexample': counterexample}, f)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the directory is no larger than max_bytes.
+        """
+        entries = {}
+        for name in os.listdir(self.directory):
+            stat = os.stat(os.path.join(self.directory, name))
+            entries[name] = (stat.st_size, stat.st_mtime)
+        total = sum([size for size, _ in entries.values()])
+        for name in sorted(entries, key=lambda n: entries[n][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= entries[name][0]
+
+def find_counterexample(network, cache, budget=None):
+    """
+    Like network.find_counterexample(), but looks up the verdict and the counterexample in the cache first, and stores them there otherwise.
+
+    :param network: a StellarNetwork
+    :param cache: a VerdictCache
+    :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned, and nothing is cached, if it runs out
+    """
+    with instrumentation.phase('cache'):
+        key = cache.key(network.validators, network.threshold_encoding, network.translation)
+        entry = cache.get(key)
+    if entry is not None:
+        return entry
+    verdict, counterexample = network.find_counterexample(budget=budget)
+    if verdict is not budgets.UNKNOWN:
+        with instrumentation.phase('cache'):
+            cache.put(key, verdict, counterexample)
+    return verdict, counterexample
@@ -0,0 +1,58 @@
+import network_cache
+import os
+import stellar_network
+import tempfile
+import unittest
+from quorum_set import QSet
+
+class TestVerdictCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_key(self):
+        cache = network_cache.VerdictCache(self.directory.name)
+        qset = lambda threshold, validators: QSet.from_json({'threshold' : threshold, 'validators' : validators, 'innerQuorumSets' : []})
+        validators1 = {'A' : qset(1, ['A','B']), 'B' : qset(1, ['A'])}
+        # same network, listed in a different order
+        validators2 = {'B' : qset(1, ['A']), 'A' : qset(1, ['B','A'])}
+        validators3 = {'A' : qset(2, ['A','B']), 'B' : qset(1, ['A'])}
+        self.assertEqual(cache.key(validators1), cache.key(validators2))
+        self.assertNotEqual(cache.key(validators1), cache.key(validators3))
+        # the key of a network is that of its validators
+        self.assertEqual(cache.key(validators1), cache.key(stellar_network.StellarNetwork(
+            [{'publicKey' : pk, 'quorumSet' : q} for pk, q in validators1.items()]).validators))
+
+    def test_counterexample(self):
+        cache = network_cache.VerdictCache(self.directory.name)
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['C'], 'innerQuorumSets' : []}}])
+        key = cache.key(network.validators)
+        self.assertIsNone(cache.get(key))
+        verdict, counterexample = network_cache.find_counterexample(network, cache)
+        self.assertFalse(verdict)
+        self.assertEqual(counterexample.quorums, (frozenset(['A', 'B']), frozenset(['C'])))
+        # the counterexample is cached with the verdict, and served without solving again
+        self.assertEqual(cache.get(key), (False, counterexample))
+        network.find_counterexample = None
+        self.assertEqual(network_cache.find_counterexample(network, cache), (False, counterexample))
+        cache.put(key, True)
+        self.assertEqual(network_cache.find_counterexample(network, cache), (True, None))
+        # the encoding is part of the key
+        combinations = stellar_network.StellarNetwork(
+            [{'publicKey' : pk, 'quorumSet' : qset} for pk, qset in network.validators.items()], threshold_encoding='combinations')
+        self.assertNotEqual(key, cache.key(combinations.validators, 'combinations'))
+
+    def test_eviction(self):
+        cache = network_cache.VerdictCache(self.directory.name)
+        cache.put('a', True)
+        os.utime(cache.path('a', '.json'), (0, 0))
+        # room for one entry only
+        cache.max_bytes = os.path.getsize(cache.path('a', '.json'))
+        cache.put('b', True)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), (True, None))
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+import hashlib
+import json
+
+"""
+This file contains the representation of quorumSets, and of the counterexamples showing that a network is not intertwined.
+It does not depend on pysmt, so that networks can be loaded, inspected and looked up in the cache of verdicts (see network_cache) without loading the solving machinery.
+"""
+
+@dataclass(frozen=True)
+class QSet:
+    """
+    A quorumSet. Can be used as a key in a dictionary and as an element in a set.
+    """
+    threshold: int
+    validators: frozenset[str]
+    innerQuorumSets: frozenset
+
+    @staticmethod
+    def from_json(json_qset, interned=None):
+        """
+        :param json_qset: a dictionary representing the quorumSet, or a QSet, which is returned as is
+        :param interned: if not None, a dictionary mapping QSets to themselves, used to share identical QSets (including inner ones) instead of creating copies; new QSets are added to it
+        """
+        if isinstance(json_qset, QSet):
+            return json_qset
+        qset = QSet(json_qset['threshold'],
+                    frozenset(json_qset['validators']),
+                    frozenset([QSet.from_json(qset, interned) for qset in json_qset['innerQuorumSets']]))
+        if interned is not None:
+            qset = interned.setdefault(qset, qset)
+        return qset
+
+    def to_json(self):
+        """
+        Return the dictionary representing this quorumSet, as accepted by from_json.
+        """
+        return {'threshold' : self.threshold,
+                'validators' : sorted(self.validators),
+                'innerQuorumSets' : [qset.to_json() for qset in self.innerQuorumSets]}
+
+    def all_validators(self):
+        """
+        Return the set of validators appearing in this qset or in its inner qsets, recursively.
+        """
+        return self.validators.union(*[qset.all_validators() for qset in self.innerQuorumSets])
+
+    def is_satisfied_by(self, validators):
+        """
+        :param validators: a set of public keys
+        :return: whether validators contains a slice of this qset
+        """
+        count = len(self.validators & validators) + len([q for q in self.innerQuorumSets if q.is_satisfied_by(validators)])
+        return count >= self.threshold
+
+@dataclass
+class Counterexample:
+    """
+    Evidence that a network is not intertwined.
+
+    :ivar pair: two validators that are not intertwined
+    :ivar quorums: two disjoint quorums, as frozensets of public keys, containing respectively the first and the second validator of pair
+    """
+    pair: tuple
+    quorums: tuple
+
+def content_hash(validators):
+    """
+    Return a hash of the validators and their quorumSets that does not depend on the order in which they are listed, nor on the process.
+
+    :param validators: a dictionary mapping public keys to QSets
+    """
+    def normalize(qset):
+        return [qset.threshold, sorted(qset.validators), sorted([normalize(q) for q in qset.innerQuorumSets])]
+    normalized = sorted([[pk, normalize(qset)] for pk, qset in validators.items()])
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
@@ -0,0 +1,248 @@
+import budgets
+import concurrent.futures
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+
+"""
+This file contains SAT solver backends for DIMACS instances, such as those produced by tvl.validity_dimacs.
+A backend is any object with a method solve(dimacs) that returns True iff the instance is satisfiable; it can be passed to tvl.is_valid and to StellarNetwork.
+To be used with a budgets.Budget, solve must also accept a budget keyword argument, and return budgets.UNKNOWN when the budget runs out.
+A backend may also have a method solve_model(dimacs, budget=None) returning a satisfying assignment as well (see tvl.solve_model); it is needed by StellarNetwork.find_counterexample, and so by the command-line interface.
+"""
+
+# Command lines of known SAT solvers, to which the path of a DIMACS file is appended
+COMMANDS = {
+    'kissat': ['kissat', '-q'],
+    'cadical': ['cadical', '-q'],
+    'minisat': ['minisat', '-verb=0'],
+    'z3': ['z3', '-dimacs'],
+}
+
+# The solvers of COMMANDS that do not print their model on 'v' lines, but write it to a file whose path is given after that of the instance
+MODEL_FILE_SOLVERS = {'minisat'}
+
+def available_solvers():
+    """
+    Return the names of the solvers of COMMANDS that are installed.
+    """
+    return [name for name, command in COMMANDS.items() if shutil.which(command[0])]
+
+class Z3Solver:
+    """
+    Solves instances with the z3 Python API, in the current process.
+    """
+    name = 'z3-api'
+
+    def solve(self, dimacs, budget=None):
+        import three_valued_logic as tvl
+        return tvl.solve_dimacs(dimacs, budget)
+
+    def solve_model(self, dimacs, budget=None):
+        import three_valued_logic as tvl
+        return tvl.solve_dimacs_model(dimacs, budget)
+
+class ExternalSolver:
+    """
+    Runs a SAT solver as a subprocess on a DIMACS file.
+    The answer is read from the 's SATISFIABLE' or 's UNSATISFIABLE' line of its output, or else from the conventional exit codes 10 and 20.
+    """
+
+    def __init__(self, name, command=None, model_file=None):
+        """
+        :param name: the name of the solver
+        :param command: the command line of the solver, without the path of the instance; defaults to COMMANDS[name]
+        :param model_file: if True, the solver writes its answer and model to a file, in the format of minisat, instead of printing them; defaults to whether name is in MODEL_FILE_SOLVERS
+        """
+        if command is None and name not in COMMANDS:
+            raise ValueError("Unknown solver: {}".format(name))
+        self.name = name
+        self.command = COMMANDS[name] if command is None else command
+        self.model_file = name in MODEL_FILE_SOLVERS if model_file is None else model_file
+
+    def start(self, path, budget=None, result_path=None):
+        """
+        Start the solver on the DIMACS file at path, and return the process.
+
+        :param budget: if not None, a budgets.Budget whose memory cap is applied to the process
+        :param result_path: if not None and the solver writes its model to a file (see model_file), the path of that file
+        """
+        arguments = [result_path] if self.model_file and result_path is not None else []
+        return subprocess.Popen(self.command + [path] + arguments, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                                preexec_fn=budget.limit_memory if budget is not None and budget.memory_mb is not None else None)
+
+    def wait(self, process, budget=None):
+        """
+        Wait for a process returned by start, and return True iff the instance is satisfiable.
+
+        :param budget: if not None, a budgets.Budget; the process is killed and budgets.UNKNOWN is returned when the time is up, and a process that dies without answering under a memory cap is taken to have run out of memory
+        """
+        return self.wait_output(process, budget)[0]
+
+    def wait_output(self, process, budget=None):
+        """
+        Like wait, but return a pair of the answer and the output of the solver.
+        """
+        try:
+            output, _ = process.communicate(timeout=None if budget is None else budget.remaining())
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            return budgets.UNKNOWN, ''
+        for line in output.splitlines():
+            if line.strip() in ('s SATISFIABLE', 'SATISFIABLE'):
+                return True, output
+            if line.strip() in ('s UNSATISFIABLE', 'UNSATISFIABLE'):
+                return False, output
+        if process.returncode in (10, 20):
+            return process.returncode == 10, output
+        if budget is not None and budget.memory_mb is not None:
+            return budgets.UNKNOWN, output
+        raise RuntimeError("{} gave no answer (exit code {})".format(self.name, process.returncode))
+
+    def solve(self, dimacs, budget=None):
+        with DimacsFile(dimacs) as path:
+            return self.wait(self.start(path, budget), budget)
+
+    def wait_model(self, process, budget=None, result_path=None):
+        """
+        Like wait, but return a pair of the answer and, if the instance is satisfiable, the set of the variables that are true in the model.
+        The model is read from the 'v' lines of the output or, for solvers with model_file, from the file at result_path, which holds 'SAT' or 'UNSAT' followed by the literals of the model.
+        """
+        answer, output = self.wait_output(process, budget)
+        if answer is not True:
+            return answer, None
+        if self.model_file:
+            with open(result_path, 'r') as f:
+                lines = f.read().split('\n', 1)
+            if lines[0].strip() != 'SAT' or len(lines) < 2:
+                raise RuntimeError("{} wrote no model".format(self.name))
+            return True, set([int(lit) for lit in lines[1].split() if int(lit) > 0])
+        lines = [line.split()[1:] for line in output.splitlines() if line.startswith('v ')]
+        if not lines:
+            raise RuntimeError("{} printed no model".format(self.name))
+        return True, set([int(lit) for line in lines for lit in line if int(lit) > 0])
+
+    def solve_model(self, dimacs, budget=None):
+        """
+        Like solve, but also return the model (see wait_model).
+        """
+        with DimacsFile(dimacs) as path, DimacsFile('') as result_path:
+            return self.wait_model(self.start(path, budget, result_path), budget, result_path)
+
+class DimacsFile:
+    """
+    A temporary file holding a DIMACS instance, removed when the with block exits.
+    """
+
+    def __init__(self, dimacs):
+        self.dimacs = dimacs
+
+    def __enter__(self):
+        fd, self.path = tempfile.mkstemp(suffix='.cnf')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.dimacs)
+        return self.path
+
+    def __exit__(self, *exc):
+        os.remove(self.path)
+
+class SolverPool:
+    """
+    A pool of threads driving solver processes, reused across instances.
+    SAT solvers read a single instance and exit, so each instance gets fresh processes; the pool bounds how many run at once.
+    """
+
+    def __init__(self, max_workers=None):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    def submit(self, solver, dimacs, budget=None):
+        """
+        Solve the instance in the pool, and return a future of the answer.
+        """
+        if budget is None:
+            return self.executor.submit(solver.solve, dimacs)
+        return self.executor.submit(solver.solve, dimacs, budget=budget)
+
+    def portfolio(self, solvers, dimacs, budget=None, model=False):
+        """
+        Run all the external solvers on the instance at once; the first answer wins, and the other solvers are killed.
+        A solver that fails does not stop the others.
+
+        :param budget: if not None, a budgets.Budget applying to each solver
+        :param model: if True, answers are pairs of the answer and the model, as returned by ExternalSolver.wait_model
+        :return: a pair of the answer and the name of the solver that gave it, or of budgets.UNKNOWN (or (budgets.UNKNOWN, None) with model) and None if they all ran out of budget
+        """
+        with contextlib.ExitStack() as stack:
+            path = stack.enter_context(DimacsFile(dimacs))
+            result_paths = [stack.enter_context(DimacsFile('')) if model and solver.model_file else None for solver in solvers]
+            processes = []
+            try:
+                # a solver that fails to start must not leave the ones already started running
+                for solver, result_path in zip(solvers, result_paths):
+                    processes.append(solver.start(path, budget, result_path))
+                futures = dict([(self.executor.submit(solver.wait_model, process, budget, result_path) if model else self.executor.submit(solver.wait, process, budget), solver)
+                                for solver, process, result_path in zip(solvers, processes, result_paths)])
+                out_of_budget = False
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        result = future.result()
+                    except RuntimeError:
+                        continue
+                    if (result[0] if model else result) is budgets.UNKNOWN:
+                        out_of_budget = True
+                        continue
+                    return result, futures[future].name
+                if out_of_budget:
+                    return ((budgets.UNKNOWN, None) if model else budgets.UNKNOWN), None
+                raise RuntimeError("No solver gave an answer")
+            finally:
+                for process in processes:
+                    if process.poll() is None:
+                        process.kill()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Portfolio:
+    """
+    A backend that races several external solvers on a SolverPool.
+
+    :ivar last_winner: the name of the solver that answered the last instance
+    """
+
+    def __init__(self, solvers, pool=None):
+        """
+        :param solvers: a list of ExternalSolvers
+        :param pool: a SolverPool; by default, a new pool with one thread per solver
+        """
+        self.solvers = solvers
+        self.pool = SolverPool(len(solvers)) if pool is None else pool
+        self.last_winner = None
+
+    def solve(self, dimacs, budget=None):
+        result, self.last_winner = self.pool.portfolio(self.solvers, dimacs, budget)
+        return result
+
+    def solve_model(self, dimacs, budget=None):
+        result, self.last_winner = self.pool.portfolio(self.solvers, dimacs, budget, model=True)
+        return result
+
+def backend(names):
+    """
+    Return the backend described by a comma-separated list of solver names: 'z3-api' for the z3 Python API, a name from COMMANDS, or several of them to race them.
+    """
+    names = names.split(',')
+    if names == ['z3-api']:
+        return Z3Solver()
+    if len(names) == 1:
+        return ExternalSolver(names[0])
+    return Portfolio([ExternalSolver(name) for name in names])
@@ -0,0 +1,100 @@
+import budgets
+import shutil
+import solvers
+import stellar_network
+import sys
+import three_valued_logic as tvl
+import unittest
+
+def fake_solver(name, answer, delay=0):
+    """
+    A solver that prints answer after delay seconds, whatever the instance.
+    """
+    script = "import time; time.sleep({}); print({!r})".format(delay, answer)
+    return solvers.ExternalSolver(name, [sys.executable, '-c', script])
+
+class RecordingSolver(solvers.ExternalSolver):
+    """
+    An ExternalSolver that keeps the processes it starts.
+    """
+
+    def __init__(self, name, command):
+        super().__init__(name, command)
+        self.processes = []
+
+    def start(self, path, budget=None, result_path=None):
+        process = super().start(path, budget, result_path)
+        self.processes.append(process)
+        return process
+
+SAT = 'p cnf 2 2\n1 2 0\n-1 0\n'
+UNSAT = 'p cnf 1 2\n1 0\n-1 0\n'
+
+class TestSolvers(unittest.TestCase):
+    def test_parse(self):
+        self.assertTrue(fake_solver('a', 's SATISFIABLE').solve(SAT))
+        self.assertFalse(fake_solver('b', 's UNSATISFIABLE').solve(SAT))
+        with self.assertRaises(RuntimeError):
+            fake_solver('c', 's UNKNOWN').solve(SAT)
+        with self.assertRaises(ValueError):
+            solvers.ExternalSolver('foo')
+
+    def test_portfolio(self):
+        with solvers.SolverPool(3) as pool:
+            portfolio = solvers.Portfolio([fake_solver('slow', 's SATISFIABLE', 10), fake_solver('broken', 'oops'), fake_solver('fast', 's UNSATISFIABLE')], pool)
+            self.assertFalse(portfolio.solve(UNSAT))
+            self.assertEqual(portfolio.last_winner, 'fast')
+            self.assertTrue(pool.submit(solvers.Z3Solver(), SAT).result())
+            # a solver that cannot be started does not leave the others running
+            slow = RecordingSolver('slow', [sys.executable, '-c', 'import time; time.sleep(10)'])
+            with self.assertRaises(OSError):
+                pool.portfolio([slow, solvers.ExternalSolver('missing', ['/nonexistent/solver'])], SAT)
+            # the process was killed, so it does not take its 10 seconds
+            self.assertNotEqual(slow.processes[0].wait(5), 0)
+
+    def test_budget(self):
+        self.assertIs(fake_solver('slow', 's SATISFIABLE', 10).solve(SAT, budget=budgets.Budget(0.5)), budgets.UNKNOWN)
+        self.assertTrue(fake_solver('fast', 's SATISFIABLE').solve(SAT, budget=budgets.Budget(10)))
+        # a solver that dies without answering under a memory cap is taken to have run out of memory
+        self.assertIs(fake_solver('broken', 'oops').solve(SAT, budget=budgets.Budget(10, 2**12)), budgets.UNKNOWN)
+        with solvers.SolverPool(2) as pool:
+            portfolio = solvers.Portfolio([fake_solver('slow', 's SATISFIABLE', 10), fake_solver('broken', 'oops')], pool)
+            self.assertIs(portfolio.solve(SAT, budget=budgets.Budget(0.5)), budgets.UNKNOWN)
+            self.assertIsNone(portfolio.last_winner)
+        self.assertIs(tvl.solve(SAT, solvers.Z3Solver(), budgets.Budget(0)), budgets.UNKNOWN)
+        self.assertTrue(tvl.solve(SAT, solvers.Z3Solver(), budgets.Budget(10)))
+
+    def test_model(self):
+        self.assertEqual(fake_solver('a', 's SATISFIABLE\nv -1 2\nv 0').solve_model(SAT), (True, {2}))
+        self.assertEqual(fake_solver('b', 's UNSATISFIABLE').solve_model(UNSAT), (False, None))
+        with self.assertRaises(RuntimeError):
+            fake_solver('c', 's SATISFIABLE').solve_model(SAT)
+        self.assertEqual(solvers.Z3Solver().solve_model(SAT), (True, {2}))
+        # minisat writes its model to a file given after the instance
+        self.assertTrue(solvers.ExternalSolver('minisat').model_file)
+        for answer, expected in [('SAT\n-1 2 0\n', (True, {2})), ('UNSAT\n', (False, None))]:
+            script = "import sys; open(sys.argv[2], 'w').write({!r}); sys.exit({})".format(answer, 10 if expected[0] else 20)
+            self.assertEqual(solvers.ExternalSolver('e', [sys.executable, '-c', script], model_file=True).solve_model(SAT), expected)
+        # portfolios race the models of their solvers
+        with solvers.SolverPool(2) as pool:
+            portfolio = solvers.Portfolio([fake_solver('slow', 's SATISFIABLE\nv 1 0', 10), fake_solver('d', 's SATISFIABLE\nv -1 2 0')], pool)
+            self.assertEqual(tvl.solve_model(SAT, portfolio), (True, {2}))
+            self.assertEqual(portfolio.last_winner, 'd')
+            portfolio = solvers.Portfolio([fake_solver('slow', 's SATISFIABLE', 10)], pool)
+            self.assertEqual(portfolio.solve_model(SAT, budget=budgets.Budget(0.5)), (budgets.UNKNOWN, None))
+        # backends without solve_model are rejected rather than replaced by another solver
+        with self.assertRaises(TypeError):
+            tvl.solve_model(SAT, object())
+
+    @unittest.skipUnless(shutil.which('z3'), "the z3 executable is not installed")
+    def test_z3_executable(self):
+        solver = solvers.backend('z3')
+        self.assertTrue(solver.solve(SAT))
+        self.assertFalse(solver.solve(UNSAT))
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B'], 'innerQuorumSets' : []}}],
+            solver=solvers.backend('z3,z3'))
+        self.assertTrue(network.check_network_intertwined(decompose=False))
+        self.assertTrue(tvl.is_valid(tvl.Not(tvl.F), solver=solver))
+        self.assertEqual(solver.solve_model(SAT), (True, {2}))
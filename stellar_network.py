@@ -1,30 +1,35 @@
+from array import array
+import budgets
+import multiprocessing
 import itertools
 import pysmt.shortcuts as ps
 import three_valued_logic as tvl
-import json
-from dataclasses import dataclass
+import instrumentation
+import quorum_set
+import random
+from dataclasses import dataclass, field
+from quorum_set import Counterexample, QSet
 
 """
 This file contains functions for checking whether a given network of validators (consisting of public keys and their quorumSets) is intertwined by reduction to SAT.
 """
 
-@dataclass(frozen=True)
-class QSet:
+@dataclass
+class PartialResult:
     """
-    A quorumSet. Can be used as a key in a dictionary and as an element in a set.
-    """
-    threshold: int
-    validators: frozenset[str]
-    innerQuorumSets: frozenset
+    The outcome of StellarNetwork.check_network_intertwined_within.
 
-    @staticmethod
-    def from_json(json_qset):
-        """
-        :param json_qset: a dictionary representing the quorumSet
-        """
-        return QSet(json_qset['threshold'],
-                    frozenset(json_qset['validators']),
-                    frozenset([QSet.from_json(qset) for qset in json_qset['innerQuorumSets']]))
+    :ivar intertwined: True, False, or budgets.UNKNOWN
+    :ivar intertwined_pairs: the pairs of validators proven intertwined, if the check fell back to checking pairs one by one
+    :ivar undecided_pairs: the pairs of validators that could not be checked within the budget
+    :ivar non_intertwined_pair: a pair of validators that are not intertwined, if one was found by checking pairs
+    :ivar counterexample: a Counterexample, if the full check found the network not to be intertwined
+    """
+    intertwined: bool | budgets.Unknown
+    intertwined_pairs: list = field(default_factory=list)
+    undecided_pairs: list = field(default_factory=list)
+    non_intertwined_pair: tuple = None
+    counterexample: Counterexample = None
 
 class StellarNetwork:
     """
@@ -32,11 +37,26 @@ class StellarNetwork:
 
     :ivar validators: a dictionary mapping public keys to quorumSets
     :ivar qset: the set of all quorumSets in the network
+    :ivar validator_ids: a dictionary mapping public keys to dense integer ids
+    :ivar qset_ids: a dictionary mapping each distinct quorumSet, including inner quorumSets, to a dense integer id
+    :ivar id_qsets: the quorumSet of each qset id
+    :ivar validator_qsets: the id of the quorumSet of each validator, indexed by validator id
+    :ivar qset_thresholds: the threshold of each quorumSet, indexed by qset id
+    :ivar qset_validators: the ids of the validators of each quorumSet, indexed by qset id
+    :ivar qset_inner: the ids of the inner quorumSets of each quorumSet, indexed by qset id
+    :ivar qset_masks: the validators of each quorumSet as a bitset, i.e. an int whose bit i is set iff validator i is in the quorumSet, indexed by qset id
+    :ivar qset_order: the qset ids, inner quorumSets first
+    :ivar validator_symbols: the pysmt symbol of each validator, indexed by validator id
+    :ivar qset_symbols: the pysmt symbol of each quorumSet, indexed by qset id
+    :ivar threshold_encoding: how qset thresholds are encoded in closed_ax, either 'counter' (a sequential counter, polynomial in the size of the qset) or 'combinations' (one disjunction per subset of size threshold, exponential)
+    :ivar translation: how formulas are translated to classical logic, either 'cnf' or 'pysmt' (see tvl.is_valid)
+    :ivar solver: the SAT backend used with the 'cnf' translation, or None for the z3 Python API
+    :ivar lhs_memo: a dictionary shared between networks, mapping QSets to the left-hand sides of their closure axioms (see closed_ax), or None
     """
 
-    def __init__(self, validators):
+    def __init__(self, validators, threshold_encoding='counter', translation='cnf', previous=None, solver=None, lhs_memo=None):
         """
-         :param validators: list of dictionaries, each of which describes a validator; and has the following form:
+         :param validators: list of dictionaries, each of which describes a validator; and has the following form (the quorumSet can also be a QSet already):
 
         .. code-block:: python
 
@@ -49,15 +69,125 @@ class StellarNetwork:
                     'validators' : ['GABCD...', 'GABCDE...', ...], 
                     'innerQuorumSets' : [...]},
                     ...]}}
+
+        :param threshold_encoding: 'counter' or 'combinations'
+        :param translation: 'cnf' or 'pysmt'
+        :param previous: if not None, an earlier snapshot of the network whose ids and encodings are reused where possible (see update)
+        :param solver: the SAT backend used with the 'cnf' translation (see the solvers module); defaults to the z3 Python API
+        :param lhs_memo: if not None, a dictionary in which the left-hand sides of closure axioms are looked up and stored, to share them with other networks (e.g. other snapshots of the same network)
         """
+        if threshold_encoding not in ('counter', 'combinations'):
+            raise ValueError("Unknown threshold encoding: {}".format(threshold_encoding))
+        if translation not in ('cnf', 'pysmt'):
+            raise ValueError("Unknown translation: {}".format(translation))
+        self.threshold_encoding = threshold_encoding
+        self.translation = translation
+        self.solver = solver
+        self.lhs_memo = lhs_memo
         # check that no validator appears twice:
         if len(validators) != len(set([validator['publicKey'] for validator in validators])):
             raise ValueError("Duplicate validator")
         # create a dictionary mapping public keys to QSets:
-        self.validators = dict(
-            [(validator['publicKey'], QSet.from_json(validator['quorumSet'])) for validator in validators])
-        self.sanity_check()
+        with instrumentation.phase('parse'):
+            # share identical qsets, which are frequent in practice
+            interned = dict()
+            self.validators = dict(
+                [(validator['publicKey'], QSet.from_json(validator['quorumSet'], interned)) for validator in validators])
+        with instrumentation.phase('sanity_check'):
+            self.sanity_check()
         self.qsets = set(self.validators.values())
+        with instrumentation.phase('intern'):
+            self.intern(previous)
+
+    def intern(self, previous=None):
+        """
+        Give each validator and each distinct qset a dense integer id, and store the qsets as arrays of ids.
+        Formulas are built from these ids, so QSets are hashed only here.
+
+        :param previous: if not None, a StellarNetwork whose ids are kept where possible (see update)
+        """
+        qsets = []  # the distinct qsets, inner qsets first
+        seen = set()
+        def collect(qset):
+            if qset not in seen:
+                seen.add(qset)
+                for q in qset.innerQuorumSets:
+                    collect(q)
+                qsets.append(qset)
+        for qset in self.validators.values():
+            collect(qset)
+
+        self.validator_ids = stable_ids(list(self.validators), previous.validator_ids if previous else {})
+        self.qset_ids = stable_ids(qsets, previous.qset_ids if previous else {})
+        self.id_qsets = [None]*len(qsets)
+        self.qset_thresholds = array('i', [0]*len(qsets))
+        self.qset_validators = [None]*len(qsets)
+        self.qset_inner = [None]*len(qsets)
+        for qset, j in self.qset_ids.items():
+            self.id_qsets[j] = qset
+            self.qset_thresholds[j] = qset.threshold
+            self.qset_validators[j] = array('i', sorted([self.validator_ids[v] for v in qset.validators]))
+            self.qset_inner[j] = array('i', sorted([self.qset_ids[q] for q in qset.innerQuorumSets]))
+
+        self.qset_masks = [sum([1 << v for v in validators]) for validators in self.qset_validators]
+        self.qset_order = array('i', [self.qset_ids[qset] for qset in qsets])
+
+        self.validator_qsets = array('i', [0]*len(self.validators))
+        for pk, qset in self.validators.items():
+            self.validator_qsets[self.validator_ids[pk]] = self.qset_ids[qset]
+        self.validator_symbols = [ps.Symbol("v{}".format(i)) for i in range(len(self.validator_ids))]
+        self.qset_symbols = [ps.Symbol("q{}".format(j)) for j in range(len(self.qset_thresholds))]
+
+        # the left-hand sides of the closure axioms, indexed by qset id (see closed_ax)
+        self.lhs_cache = dict()
+        if previous is not None and previous.threshold_encoding == self.threshold_encoding:
+            # the left-hand side of a qset only depends on the symbols of its elements, i.e. on their ids
+            for j, lhs in previous.lhs_cache.items():
+                if (j < len(qsets) and self.qset_thresholds[j] == previous.qset_thresholds[j]
+                        and self.qset_validators[j] == previous.qset_validators[j] and self.qset_inner[j] == previous.qset_inner[j]):
+                    self.lhs_cache[j] = lhs
+        if self.lhs_memo is not None:
+            # a memoized left-hand side is valid as long as the elements of the qset kept their ids
+            for qset, j in self.qset_ids.items():
+                entry = self.lhs_memo.get(qset)
+                if (j not in self.lhs_cache and entry is not None and entry[0] == self.threshold_encoding
+                        and entry[1] == self.qset_validators[j] and entry[2] == self.qset_inner[j]):
+                    self.lhs_cache[j] = entry[3]
+
+    def diff(self, validators):
+        """
+        Compare the network to a newer list of validators, in the form accepted by __init__.
+
+        :return: a pair (removed, changed) where removed is the list of public keys of the validators that are gone, and changed is the list of the validators (in the form accepted by __init__) that joined or whose quorumSet changed
+        """
+        new_pks = set([validator['publicKey'] for validator in validators])
+        removed = [pk for pk in self.validators if pk not in new_pks]
+        changed = [validator for validator in validators
+                   if self.validators.get(validator['publicKey']) != QSet.from_json(validator['quorumSet'])]
+        return removed, changed
+
+    def apply_diff(self, removed, changed):
+        """
+        Return the network obtained by removing and changing validators as described by diff.
+        Validators and qsets that remain keep their ids, so the closure axioms of the qsets that did not change are reused as is.
+        """
+        validators = dict([(pk, qset) for pk, qset in self.validators.items() if pk not in removed])
+        for validator in changed:
+            validators[validator['publicKey']] = validator['quorumSet']
+        return StellarNetwork([{'publicKey' : pk, 'quorumSet' : qset} for pk, qset in validators.items()],
+                              self.threshold_encoding, self.translation, previous=self, solver=self.solver, lhs_memo=self.lhs_memo)
+
+    def update(self, validators):
+        """
+        Return the network described by validators (in the form accepted by __init__), reusing what can be reused from this one.
+        """
+        return self.apply_diff(*self.diff(validators))
+
+    def symbol(self, pk):
+        """
+        Return the symbol of the validator with public key pk.
+        """
+        return self.validator_symbols[self.validator_ids[pk]]
 
     def sanity_check(self):
         """
@@ -86,83 +216,533 @@ class StellarNetwork:
             except ValueError as e:
                 raise ValueError("Error in validator {}: {}".format(pk, e))
 
-    def closed_ax(self):
+    def closed_ax(self, restrict_to=None, budget=None):
         """
         Return the closedAx formula as computed from the quorumSets of the validators.
+
+        :param restrict_to: if not None, a set of public keys; only the axioms of those validators are included, and the other validators appearing in their qsets are forced to be both true and false, i.e. they cannot belong to any quorum
+        :param budget: if not None, a budgets.Budget checked after each validator; budgets.BudgetExceeded is raised if it runs out
         """
 
-        lhs_cache = dict()
+        lhs_cache = self.lhs_cache
+        # the qsets whose own symbol already has its closure axioms (a qset can be in lhs_cache because a validator has it as quorumSet, or from a previous call)
+        closed_qsets = set()
         closed_ax_fmlas = []
-    
-        def add_closed_ax(validator_or_qset, qset):
+
+        def lhs(j):
+            """
+            Return the formulas stating that the designated, respectively anti-designated, elements of qset j block it.
+
+            :param j: a qset id
             """
-            Add the closure axioms for the given qset to the list closed_ax.
+            if j not in lhs_cache:
+                elems = [self.validator_symbols[v] for v in self.qset_validators[j]] + [self.qset_symbols[k] for k in self.qset_inner[j]]
+                threshold = self.qset_thresholds[j]
+                if self.threshold_encoding == 'combinations':
+                    witnesses = list(itertools.combinations(elems, threshold))
+                    lhs_pos = And(*[Or(*w) for w in witnesses])
+                    lhs_neg = And(*[Or(*[tvl.Not(e) for e in w]) for w in witnesses])
+                else:
+                    # every subset of size threshold intersects the designated elements iff at least len(elems)-threshold+1 elements are designated
+                    lhs_pos = at_least(len(elems) - threshold + 1, elems)
+                    lhs_neg = at_least(len(elems) - threshold + 1, [tvl.Not(e) for e in elems])
+                lhs_cache[j] = (lhs_pos, lhs_neg)
+                if self.lhs_memo is not None:
+                    self.lhs_memo[self.id_qsets[j]] = (self.threshold_encoding, self.qset_validators[j], self.qset_inner[j], lhs_cache[j])
+            for k in self.qset_inner[j]:
+                add_closed_ax_qset(k)
+            return lhs_cache[j]
+
+        def add_closed_ax(variable, j):
+            """
+            Add the closure axioms of qset j for the given variable to the list closed_ax.
 
-            :param qset: a QSet
             :param variable: a pysmt symbol
+            :param j: a qset id
             """
-            if isinstance(validator_or_qset, QSet) and qset in lhs_cache:
-                pass
-            elif isinstance(validator_or_qset, str) and qset in lhs_cache:
-                assert len(lhs_cache[qset]) == 2
-                closed_ax_pos = tvl.Dimp(lhs_cache[qset][0], symbol(validator_or_qset))
-                closed_ax_neg = tvl.Dimp(lhs_cache[qset][1], tvl.Not(symbol(validator_or_qset)))
-                closed_ax_fmlas.extend([closed_ax_pos,closed_ax_neg])
-            else:
-                elems = qset.validators | qset.innerQuorumSets
-                witnesses = list(itertools.combinations(elems, qset.threshold))
-                def witness_to_disj_pos(witness):
-                    return Or(*[symbol(e) for e in witness])
-                lhs_pos = And(*[witness_to_disj_pos(w) for w in witnesses])
-                closed_ax_pos = tvl.Dimp(lhs_pos, symbol(validator_or_qset))
-                def witness_to_disj_neg(witness):
-                    return Or(*[tvl.Not(symbol(e)) for e in witness])
-                lhs_neg = And(*[witness_to_disj_neg(w) for w in witnesses])
-                closed_ax_neg = tvl.Dimp(lhs_neg, tvl.Not(symbol(validator_or_qset)))
-                lhs_cache[qset] = [lhs_pos, lhs_neg]
-                closed_ax_fmlas.extend([closed_ax_pos,closed_ax_neg])
-                for innerQset in qset.innerQuorumSets:
-                    add_closed_ax(innerQset, innerQset)
-
-        for v,qset in self.validators.items():
-            add_closed_ax(v, qset)
-
-        return And(*closed_ax_fmlas)
-
-    def network_intertwined(self):
-        if len(self.validators) == 1:
+            lhs_pos, lhs_neg = lhs(j)
+            closed_ax_fmlas.extend([tvl.Dimp(lhs_pos, variable), tvl.Dimp(lhs_neg, tvl.Not(variable))])
+
+        def add_closed_ax_qset(j):
+            if j not in closed_qsets:
+                closed_qsets.add(j)
+                add_closed_ax(self.qset_symbols[j], j)
+
+        with instrumentation.phase('closed_ax'):
+            for v in (self.validators.keys() if restrict_to is None else restrict_to):
+                if budget is not None:
+                    budget.check()
+                add_closed_ax(self.symbol(v), self.validator_qsets[self.validator_ids[v]])
+            if restrict_to is not None:
+                # the validators outside restrict_to that appear in the qsets of those in it (without restriction, there are none)
+                inside = set(restrict_to)
+                outside = set().union(*[qset.all_validators() for qset in set([self.validators[v] for v in inside])]) - inside
+                for v in sorted(outside):
+                    closed_ax_fmlas.append(tvl.And(self.symbol(v), tvl.Not(self.symbol(v))))
+
+            return And(*closed_ax_fmlas)
+
+    def network_intertwined(self, restrict_to=None, symmetry=True, budget=None):
+        """
+        :param restrict_to: if not None, only the validators in this set are considered (see closed_ax)
+        :param symmetry: if True, only the pairs returned by representative_pairs are required to be intertwined
+        :param budget: see closed_ax
+        """
+        validators = self.validators.keys() if restrict_to is None else restrict_to
+        if len(validators) == 1:
             return tvl.Not(tvl.F)
         else:
-            return tvl.Dimp(self.closed_ax(), And(*[intertwined(p, q) for [p,q] in itertools.combinations(self.validators.keys(), 2)]))
+            pairs = self.representative_pairs(restrict_to) if symmetry else itertools.combinations(validators, 2)
+            return tvl.Dimp(self.closed_ax(restrict_to, budget), And(*[self.intertwined(p, q) for [p,q] in pairs]))
+
+    def symmetry_classes(self, restrict_to=None):
+        """
+        Group the validators that have the same quorumSet and belong to the same quorumSets.
+        Swapping two validators of a class maps every quorumSet to itself, so it does not change the network.
+
+        :param restrict_to: if not None, only the validators in this set are grouped
+        :return: a list of lists of public keys, in the order of validator ids
+        """
+        validators = self.validators.keys() if restrict_to is None else restrict_to
+        memberships = [[] for _ in self.validator_ids]
+        for j, members in enumerate(self.qset_validators):
+            for i in members:
+                memberships[i].append(j)
+        classes = dict()
+        for pk in sorted(validators, key=lambda pk: self.validator_ids[pk]):
+            i = self.validator_ids[pk]
+            classes.setdefault((self.validator_qsets[i], tuple(memberships[i])), []).append(pk)
+        return list(classes.values())
+
+    def representative_pairs(self, restrict_to=None):
+        """
+        Return pairs of validators that are intertwined iff all pairs of validators are.
+        Since swapping the validators of a symmetry class does not change the network (nor restrict_to, when both validators are in it), every pair of validators can be mapped to a pair made of the first validators of their classes, or of the first two validators of their common class.
+
+        :param restrict_to: if not None, only the validators in this set are considered
+        """
+        classes = self.symmetry_classes(restrict_to)
+        pairs = [(c[0], d[0]) for c, d in itertools.combinations(classes, 2)]
+        pairs += [(c[0], c[1]) for c in classes if len(c) > 1]
+        return pairs
         
-    def check_intertwined(self, p, q):
-        return tvl.is_valid(tvl.Dimp(self.closed_ax(), intertwined(p,q)))
+    def intertwined(self, p, q):
+        """
+        :param p: a public key
+        :param q: a public key
+        """
+        return intertwined(self.symbol(p), self.symbol(q))
+
+    def check_intertwined(self, p, q, budget=None):
+        """
+        :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if it runs out
+        """
+        return tvl.is_valid(tvl.Dimp(self.closed_ax(), self.intertwined(p,q)), translation=self.translation, solver=self.solver, budget=budget)
         
+    def check_network_intertwined(self, max_workers=None, chunk_size=64, decompose=True, symmetry=True, budget=None, precheck=True):
+        """
+        :param max_workers: if not None, check the pairs of validators separately on a pool of that many processes (see find_non_intertwined_pair), after the decomposition and the precheck
+        :param decompose: if True, only encode the validators of the quorum-bearing strongly connected component of the trust graph (see quorum_bearing_components)
+        :param symmetry: if True, only check one pair of validators per pair of symmetry classes (see representative_pairs)
+        :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if it runs out (see also check_network_intertwined_within)
+        :param precheck: if True, first look for disjoint quorums with find_disjoint_quorums, and only use SAT if there are none
+        """
+        if max_workers is not None and budget is not None:
+            raise ValueError("Budgets are not supported with max_workers")
+        restrict_to = None
+        if decompose:
+            with instrumentation.phase('decompose'):
+                components = self.quorum_bearing_components()
+            if len(components) != 1:
+                # two quorums in different components are disjoint, and without quorums there is nothing to check
+                return len(components) == 0
+            restrict_to = components[0]
+        try:
+            if precheck and self.find_disjoint_quorums(restrict_to, budget=budget) is not None:
+                return False
+            if max_workers is not None:
+                return self.find_non_intertwined_pair(max_workers, chunk_size, restrict_to=restrict_to, symmetry=symmetry) is None
+            formula = self.network_intertwined(restrict_to, symmetry, budget)
+        except budgets.BudgetExceeded:
+            return budgets.UNKNOWN
+        return tvl.is_valid(formula, translation=self.translation, solver=self.solver, budget=budget)
+
+    def check_network_intertwined_within(self, budget, fraction=0.5, symmetry=True, precheck=True):
+        """
+        Check the network within budget, degrading gracefully: if the full check runs out of its share of the budget, the pairs of validators are checked one by one with what is left, and those that could not be decided are reported.
+        The full check is made by find_counterexample, so a negative answer comes with its counterexample.
+
+        :param budget: a budgets.Budget
+        :param fraction: the fraction of the budget given to the full check
+        :param symmetry: if True, only the pairs returned by representative_pairs are checked
+        :param precheck: if True, first look for disjoint quorums with find_disjoint_quorums
+        :return: a PartialResult
+        """
+        verdict, counterexample = self.find_counterexample(symmetry, budget.share(fraction), precheck)
+        if verdict is not budgets.UNKNOWN:
+            return PartialResult(verdict, counterexample=counterexample)
+
+        # the full check only runs out of budget when there is a single quorum-bearing component
+        components = self.quorum_bearing_components()
+        pairs = self.representative_pairs(components[0]) if symmetry else list(itertools.combinations(sorted(components[0]), 2))
+        result = PartialResult(budgets.UNKNOWN)
+        try:
+            session = IntertwinedSession(self, components[0], budget)
+        except budgets.BudgetExceeded:
+            result.undecided_pairs = pairs
+            return result
+        for i, (p, q) in enumerate(pairs):
+            # each pair gets an equal share of the time left, so that a hard pair does not starve the others
+            verdict = session.check_intertwined(p, q, budget.share(1/(len(pairs)-i)))
+            if verdict is budgets.UNKNOWN:
+                result.undecided_pairs.append((p, q))
+            elif verdict is True:
+                result.intertwined_pairs.append((p, q))
+            else:
+                result.intertwined = False
+                result.non_intertwined_pair = (p, q)
+                result.undecided_pairs.extend(pairs[i+1:])
+                return result
+        if not result.undecided_pairs:
+            result.intertwined = True
+        return result
+
+    def find_counterexample(self, symmetry=True, budget=None, precheck=True):
+        """
+        Check the network like check_network_intertwined, and explain a negative answer with a Counterexample, with a single solver call.
+        When the SAT instance is satisfiable, the model gives a valuation in which closedAx is designated and some intertwined(p,q) is F, i.e. one of p and q is T and the other F.
+        By the closure axioms, every validator that is F has a slice of validators that are F, and likewise for T; so the validators that are T, and those that are F, are two disjoint quorums.
+        The clause encoding is used whatever the translation of the network.
+
+        :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if it runs out
+        :param precheck: if True, first look for disjoint quorums with find_disjoint_quorums
+        :return: a pair of the answer of check_network_intertwined and, if it is False, a Counterexample, or else None
+        """
+        with instrumentation.phase('decompose'):
+            components = self.quorum_bearing_components()
+        if len(components) == 0:
+            return True, None
+        if len(components) > 1:
+            quorums = (components[0], components[1])
+        else:
+            try:
+                quorums = self.find_disjoint_quorums(components[0], budget=budget) if precheck else None
+                formula = None if quorums is not None else self.network_intertwined(components[0], symmetry, budget)
+            except budgets.BudgetExceeded:
+                return budgets.UNKNOWN, None
+            if quorums is None:
+                verdict, valuation = tvl.find_countermodel(formula, self.solver, budget)
+                if verdict is not False:
+                    return verdict, None
+                # validators outside the component are B, so they are in neither quorum
+                quorums = tuple([frozenset([pk for pk in components[0] if valuation.get(self.symbol(pk)) == value]) for value in 'TF'])
+        return False, Counterexample((min(quorums[0]), min(quorums[1])), quorums)
+
+    def intertwined_dimacs(self):
+        """
+        Return a DIMACS instance that is unsatisfiable iff the network is intertwined, after decomposition (see check_network_intertwined).
+        """
+        with instrumentation.phase('decompose'):
+            components = self.quorum_bearing_components()
+        if len(components) == 0:
+            return "p cnf 0 1\n0\n"
+        elif len(components) > 1:
+            return "p cnf 0 0\n"
+        return tvl.validity_dimacs(self.network_intertwined(components[0]))
+
+    def content_hash(self):
+        """
+        Return a hash of the validators and their quorumSets that does not depend on the order in which they are listed, nor on the process (see quorum_set.content_hash).
+        """
+        return quorum_set.content_hash(self.validators)
+
+    def trust_graph(self):
+        """
+        Return a dictionary mapping each validator to the set of validators appearing in its qset.
+        """
+        return dict([(v, qset.all_validators()) for v, qset in self.validators.items()])
+
+    def strongly_connected_components(self):
+        """
+        Return the strongly connected components of the trust graph, as a list of frozensets (Tarjan's algorithm, without recursion).
+        """
+        graph = self.trust_graph()
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for root in graph:
+            if root in index:
+                continue
+            work = [(root, iter(graph[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                v, successors = work[-1]
+                w = next(successors, None)
+                if w is None:
+                    work.pop()
+                    if work:
+                        lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[v])
+                    if lowlink[v] == index[v]:
+                        component = set()
+                        while True:
+                            w = stack.pop()
+                            on_stack.remove(w)
+                            component.add(w)
+                            if w == v:
+                                break
+                        components.append(frozenset(component))
+                elif w not in index:
+                    index[w] = lowlink[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(graph[w])))
+                elif w in on_stack:
+                    lowlink[v] = min(lowlink[v], index[w])
+        return components
+
+    def max_quorum(self, validators):
+        """
+        Return the largest quorum contained in the given set of validators (possibly empty).
+        """
+        quorum = set(validators)
+        while True:
+            removed = set([v for v in quorum if not self.validators[v].is_satisfied_by(quorum)])
+            if not removed:
+                return frozenset(quorum)
+            quorum -= removed
+
+    def satisfied_qsets(self, mask):
+        """
+        Return a list of booleans, indexed by qset id, telling whether each qset is satisfied by the validators of the bitset mask.
+        """
+        satisfied = [False]*len(self.qset_thresholds)
+        for j in self.qset_order:
+            count = (mask & self.qset_masks[j]).bit_count() + len([k for k in self.qset_inner[j] if satisfied[k]])
+            satisfied[j] = count >= self.qset_thresholds[j]
+        return satisfied
+
+    def quorum_closure(self, mask):
+        """
+        Like max_quorum, on bitsets of validator ids: return the largest quorum contained in the bitset mask (possibly 0).
+        """
+        while True:
+            satisfied = self.satisfied_qsets(mask)
+            quorum = mask
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                if not satisfied[self.validator_qsets[bit.bit_length() - 1]]:
+                    quorum ^= bit
+                rest ^= bit
+            if quorum == mask:
+                return quorum
+            mask = quorum
+
+    def find_disjoint_quorums(self, restrict_to=None, tries=8, seed=0, budget=None):
+        """
+        Look for two disjoint quorums with quorum_closure fixpoints, without SAT.
+        Each try picks a random validator v of the maximal quorum and shrinks that quorum greedily, removing validators in random order as long as a quorum containing v remains; a quorum in the complement of the result is disjoint from it.
+        This is incomplete: when no disjoint quorums are found, the network may or may not be intertwined.
+
+        :param restrict_to: if not None, only quorums contained in this set of public keys are considered
+        :param tries: the number of minimal quorums tried
+        :param seed: the seed of the random choices, so that results are reproducible
+        :param budget: if not None, a budgets.Budget checked before each try; budgets.BudgetExceeded is raised if it runs out
+        :return: a pair of disjoint quorums, as frozensets of public keys, or None
+        """
+        validators = self.validators.keys() if restrict_to is None else restrict_to
+        ids = [self.validator_ids[pk] for pk in validators]
+        with instrumentation.phase('precheck'):
+            quorum = self.quorum_closure(sum([1 << i for i in ids]))
+            members = [i for i in ids if quorum >> i & 1]
+            rng = random.Random(seed)
+            for _ in range(tries if members else 0):
+                if budget is not None:
+                    budget.check()
+                v = rng.choice(members)
+                minimal = quorum
+                for u in rng.sample(members, len(members)):
+                    if u != v and minimal >> u & 1:
+                        smaller = self.quorum_closure(minimal & ~(1 << u))
+                        if smaller >> v & 1:
+                            minimal = smaller
+                other = self.quorum_closure(quorum & ~minimal)
+                if other:
+                    pks = dict([(i, pk) for pk, i in self.validator_ids.items()])
+                    return (frozenset([pks[i] for i in members if minimal >> i & 1]),
+                            frozenset([pks[i] for i in members if other >> i & 1]))
+        return None
+
+    def quorum_bearing_components(self):
+        """
+        Return the maximal quorums of the strongly connected components of the trust graph that contain a quorum.
+
+        Every quorum Q contains a quorum that lies in a single component: take a component C that intersects Q and from which no other component intersecting Q is reachable; the slices of the members of Q ∩ C lie in Q and are reachable from C, so they lie in C.
+        Hence, if two components contain a quorum, the network has two disjoint quorums; and if only one does, the network is intertwined iff the validators of its maximal quorum are.
+        """
+        return [q for q in [self.max_quorum(c) for c in self.strongly_connected_components()] if q]
+
+    def find_non_intertwined_pair(self, max_workers=None, chunk_size=64, start_method=None, restrict_to=None, symmetry=True):
+        """
+        Check each pair of validators separately, spreading chunks of pairs over a pool of processes.
+        Each process rebuilds the network from its JSON description, since pysmt terms cannot be sent to other processes, and answers its chunks with its own IntertwinedSession.
+        Stops at the first pair found not to be intertwined, terminating the processes still at work.
+
+        :param max_workers: the number of processes (defaults to the number of CPUs)
+        :param chunk_size: the number of pairs sent to a process at a time
+        :param start_method: the multiprocessing start method, e.g. 'spawn'; defaults to that of the platform
+        :param restrict_to: if not None, only the validators in this set are considered, and the sessions of the processes only encode their closure axioms (see closed_ax)
+        :param symmetry: if True, only the pairs returned by representative_pairs are checked
+        :return: a pair of validators that are not intertwined, or None if the network is intertwined
+        """
+        validators = self.validators.keys() if restrict_to is None else restrict_to
+        pairs = self.representative_pairs(restrict_to) if symmetry else list(itertools.combinations(sorted(validators), 2))
+        chunks = [pairs[i:i+chunk_size] for i in range(0, len(pairs), chunk_size)]
+        validators = [{'publicKey' : pk, 'quorumSet' : qset.to_json()} for pk, qset in self.validators.items()]
+        context = multiprocessing.get_context(start_method)
+        # leaving the with block terminates the processes, so returning early does not wait for the other chunks
+        with context.Pool(max_workers, initializer=_init_worker, initargs=(validators, self.threshold_encoding, restrict_to)) as pool:
+            for pair in pool.imap_unordered(_check_pairs, chunks):
+                if pair is not None:
+                    return pair
+        return None
+
+    def session(self):
+        """
+        Return an IntertwinedSession for many check_intertwined queries on this network.
+        """
+        return IntertwinedSession(self)
+
+class IncrementalChecker:
+    """
+    Checks successive snapshots of a network with a single tvl.IncrementalSolver.
+    Since the ids of validators and qsets are stable across snapshots (see StellarNetwork.update), the subformulas that did not change are the same pysmt terms; their clauses are not encoded again, and what the solver learned about them is kept.
+    Clauses of subformulas that are not used anymore stay in the solver; this is sound because they only define the values of those subformulas.
+    So that memory does not grow without bound in a long-running loop, the solver is replaced by a fresh one once these stale subformulas outnumber the live ones MAX_STALE_RATIO times.
+    """
+
+    MAX_STALE_RATIO = 1
+
+    def __init__(self, network):
+        self.network = network
+        self.solver = tvl.IncrementalSolver()
+
     def check_network_intertwined(self):
-        return tvl.is_valid(self.network_intertwined())
+        components = self.network.quorum_bearing_components()
+        if len(components) != 1:
+            return len(components) == 0
+        formula = self.network.network_intertwined(components[0])
+        live, stale = self.solver.usage(formula)
+        if stale > self.MAX_STALE_RATIO * live:
+            self.solver = tvl.IncrementalSolver()
+        return self.solver.is_valid(formula)
+
+    def update(self, validators):
+        """
+        Move to the snapshot described by validators (in the form accepted by StellarNetwork.__init__) and check it.
+        """
+        self.network = self.network.update(validators)
+        return self.check_network_intertwined()
+
+class IntertwinedSession:
+    """
+    Answers check_intertwined queries on a network with a single solver.
+    closedAx is built and encoded once, and each query only adds the clauses of its intertwined(p,q) formula.
+    Queries always go through the clause encoder, whatever the translation of the network.
+    """
+
+    def __init__(self, network, restrict_to=None, budget=None):
+        """
+        :param restrict_to: if not None, only the validators in this set are considered (see StellarNetwork.closed_ax)
+        :param budget: if not None, a budgets.Budget for building and encoding closedAx; budgets.BudgetExceeded is raised if it runs out
+        """
+        self.network = network
+        self.closed_ax = network.closed_ax(restrict_to, budget)
+        self.solver = tvl.IncrementalSolver()
+        self.solver.add(self.closed_ax, budget)
+
+    def check_intertwined(self, p, q, budget=None):
+        """
+        :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if it runs out
+        """
+        if p not in self.network.validators or q not in self.network.validators:
+            raise ValueError("Unknown validator: {}".format(q if p in self.network.validators else p))
+        if budget is not None and budget.expired():
+            return budgets.UNKNOWN
+        return self.solver.is_valid(tvl.Dimp(self.closed_ax, self.network.intertwined(p,q)), budget)
+
+    def check_intertwined_pairs(self, pairs, budget=None):
+        """
+        :param pairs: an iterable of pairs of public keys
+        :param budget: if not None, a budgets.Budget shared by all the pairs
+        :return: the list of verdicts, in the same order as pairs
+        """
+        return [self.check_intertwined(p, q, budget) for p, q in pairs]
+
+# The session of a worker process of find_non_intertwined_pair
+_worker_session = None
 
-def symbol(x):
+def _init_worker(validators, threshold_encoding, restrict_to):
+    global _worker_session
+    _worker_session = IntertwinedSession(StellarNetwork(validators, threshold_encoding), restrict_to)
+
+def _check_pairs(pairs):
+    """
+    Return the first pair that is not intertwined, or None.
     """
-    Associate a symbol with a validator or a QSet.
-    Hopefully, pySMT already does memoization, so we don't need to do it ourselves.
+    for p, q in pairs:
+        if _worker_session.check_intertwined(p, q) is False:
+            return (p, q)
+    return None
+
+def stable_ids(keys, previous_ids):
     """
-    assert isinstance(x, str) or isinstance(x, QSet)
-    return ps.Symbol(str(hash(x)))
+    Give the keys the ids 0 to len(keys)-1, keeping the id a key had in previous_ids when it is still in range.
+
+    :param keys: a list of distinct keys
+    :param previous_ids: a dictionary mapping keys to ids
+    """
+    n = len(keys)
+    ids = dict([(k, previous_ids[k]) for k in keys if previous_ids.get(k, n) < n])
+    free = iter(sorted(set(range(n)) - set(ids.values())))
+    for k in keys:
+        if k not in ids:
+            ids[k] = next(free)
+    return ids
 
 def And(*args):
-    assert len(args) > 0
-    value = args[0]
-    for f in args[1:]:
-        value = tvl.And(f, value)
-    return value
-    
+    return tvl.And(*args)
+
 def Or(*args):
-    assert len(args) > 0
-    value = args[0]
-    for f in args[1:]:
-        value = tvl.Or(f, value)
-    return value
+    return tvl.Or(*args)
+
+def at_least(k, fmlas):
+    """
+    Return a formula whose value is that of the disjunction, over all subsets of size k of fmlas, of the conjunction of the subset.
+    It is built as a sequential counter, with O(k*len(fmlas)) subformulas instead of one per subset.
+    Since the formula only uses And and Or, it is equivalent in three-valued logic to the CNF used by the 'combinations' encoding.
+
+    :param k: an integer between 1 and len(fmlas)
+    :param fmlas: a list of three-valued formulas
+    """
+    n = len(fmlas)
+    assert 1 <= k <= n
+    # counts[j] holds the formula "at least j of the formulas seen so far", or None if that is impossible
+    counts = [None]*(k+1)
+    for i, x in enumerate(fmlas):
+        # j can be at most i+1, and we skip the counts that the remaining n-i-1 formulas cannot bring up to k
+        for j in range(min(i+1, k), max(k-(n-i-1), 1)-1, -1):
+            with_x = x if j == 1 else tvl.And(counts[j-1], x)
+            counts[j] = with_x if counts[j] is None else tvl.Or(counts[j], with_x)
+    return counts[k]
 
 def intertwined(p, q):
-    assert isinstance(p, str) and isinstance(q, str)
-    return tvl.Or(tvl.And(symbol(p), symbol(q)),tvl.And(tvl.Not(symbol(p)),tvl.Not(symbol(q))))
+    """
+    :param p: the symbol of a validator
+    :param q: the symbol of a validator
+    """
+    return tvl.Or(tvl.And(p, q),tvl.And(tvl.Not(p),tvl.Not(q)))
@@ -1,5 +1,10 @@
+import budgets
+import itertools
+import pysmt.shortcuts as ps
 import stellar_network
+import three_valued_logic as tvl
 import unittest
+from benchmarks import generators
 
 class QSetTest(unittest.TestCase):
     def test_1(self):
@@ -72,4 +77,339 @@ class TestStellarNetwork(unittest.TestCase):
         self.assertTrue(network.check_intertwined('A','B'))
         self.assertTrue(network.check_intertwined('A','E'))
         self.assertTrue(network.check_intertwined('D','E'))
-        self.assertFalse(network.check_intertwined('A','C'))
\ No newline at end of file
+        self.assertFalse(network.check_intertwined('A','C'))
+
+class TestThresholdEncoding(unittest.TestCase):
+    def test_at_least(self):
+        """
+        The sequential counter has the same three-valued value as the CNF used by the 'combinations' encoding.
+        """
+        xs = [ps.Symbol(x) for x in ['a','b','c','d']]
+        for k in range(1, len(xs)+1):
+            cnf = stellar_network.And(*[stellar_network.Or(*w) for w in itertools.combinations(xs, len(xs)-k+1)])
+            self.assertTrue(tvl.is_valid(tvl.Equiv(stellar_network.at_least(k, xs), cnf)))
+
+    def test_same_verdicts(self):
+        validators = [
+            {'publicKey' : 'A', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'B', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'C', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['D'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'E', 'quorumSet' : {'threshold' : 2,
+                                               'validators' : ['D'],
+                                               'innerQuorumSets' : [
+                                                   {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []},
+                                               ]}}]
+        pairs = [('A','B'), ('A','E'), ('D','E'), ('A','D')]
+        verdicts = dict()
+        for encoding, translation in itertools.product(['counter', 'combinations'], ['cnf', 'pysmt']):
+            network = stellar_network.StellarNetwork(validators, threshold_encoding=encoding, translation=translation)
+            verdicts[(encoding, translation)] = [network.check_network_intertwined()] + [network.check_intertwined(p, q) for p, q in pairs]
+        # the encodings agree with each other
+        for key in verdicts:
+            self.assertEqual(verdicts[key], verdicts[('combinations', 'pysmt')], key)
+        # and with the hand-checked verdicts: every quorum containing A or E contains two of A, B and C, and any two such pairs intersect; every quorum containing E contains D; {D} and {A,B} are disjoint quorums
+        self.assertEqual(verdicts[('counter', 'cnf')], [False, True, True, True, False])
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            stellar_network.StellarNetwork(
+                [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}],
+                threshold_encoding='foo')
+
+
+class TestIntertwinedSession(unittest.TestCase):
+    def test_pairs(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['B','D'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','D'], 'innerQuorumSets' : []}}])
+        session = network.session()
+        pairs = list(itertools.combinations(network.validators.keys(), 2))
+        self.assertEqual(session.check_intertwined_pairs(pairs), [network.check_intertwined(p, q) for p, q in pairs])
+        # asking twice gives the same answer
+        self.assertTrue(session.check_intertwined('A','B'))
+        self.assertFalse(session.check_intertwined('A','C'))
+        self.assertTrue(session.check_intertwined('A','B'))
+        with self.assertRaises(ValueError):
+            session.check_intertwined('A','E')
+
+
+class TestParallelCheck(unittest.TestCase):
+    def test_intertwined(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}])
+        self.assertIsNone(network.find_non_intertwined_pair(max_workers=2, chunk_size=1))
+        self.assertTrue(network.check_network_intertwined(max_workers=2))
+
+    def test_not_intertwined(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['B','D'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','D'], 'innerQuorumSets' : []}}])
+        pair = network.find_non_intertwined_pair(max_workers=2, chunk_size=1)
+        self.assertIsNotNone(pair)
+        self.assertFalse(network.check_intertwined(*pair))
+        self.assertFalse(network.check_network_intertwined(max_workers=2))
+
+    def test_spawn(self):
+        # the pysmt terms cached by an earlier check must not be sent to the workers
+        network = stellar_network.StellarNetwork(generators.symmetric_core(4))
+        self.assertTrue(network.check_network_intertwined())
+        self.assertIsNone(network.find_non_intertwined_pair(max_workers=1, start_method='spawn'))
+
+    def test_component(self):
+        # the watchers are outside the quorum-bearing component, so only the pairs of the component are sent to the workers
+        network = stellar_network.StellarNetwork(generators.tiered(4, watchers=3))
+        component = network.quorum_bearing_components()[0]
+        self.assertIsNone(network.find_non_intertwined_pair(max_workers=1, restrict_to=component))
+        self.assertIsNone(network.find_non_intertwined_pair(max_workers=1, restrict_to=component, symmetry=False))
+        for decompose, precheck in itertools.product([True, False], [True, False]):
+            self.assertTrue(network.check_network_intertwined(max_workers=1, decompose=decompose, precheck=precheck))
+        # the precheck answers without starting processes
+        split = stellar_network.StellarNetwork(generators.symmetric_core(6, 3))
+        split.find_non_intertwined_pair = None
+        self.assertFalse(split.check_network_intertwined(max_workers=1))
+
+
+class TestDecomposition(unittest.TestCase):
+    def test_components(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['B','D'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','D'], 'innerQuorumSets' : []}}])
+        self.assertEqual(set(network.strongly_connected_components()), {frozenset({'A','B'}), frozenset({'C'}), frozenset({'D'})})
+        self.assertEqual(set(network.quorum_bearing_components()), {frozenset({'A','B'}), frozenset({'D'})})
+        self.assertFalse(network.check_network_intertwined(decompose=True))
+
+    def test_same_verdicts(self):
+        """
+        A core {A,B,C} trusted by D and E, which the core does not trust back.
+        """
+        def validators(core_threshold):
+            return [
+                {'publicKey' : 'A', 'quorumSet' : {'threshold' : core_threshold, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+                {'publicKey' : 'B', 'quorumSet' : {'threshold' : core_threshold, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+                {'publicKey' : 'C', 'quorumSet' : {'threshold' : core_threshold, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+                {'publicKey' : 'D', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','E'], 'innerQuorumSets' : []}},
+                {'publicKey' : 'E', 'quorumSet' : {'threshold' : 1,
+                                                   'validators' : ['D'],
+                                                   'innerQuorumSets' : [
+                                                       {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []},
+                                                   ]}}]
+        for core_threshold, expected in [(1, False), (2, True), (3, True)]:
+            network = stellar_network.StellarNetwork(validators(core_threshold))
+            self.assertEqual(network.quorum_bearing_components(), [frozenset({'A','B','C'})])
+            self.assertEqual(network.check_network_intertwined(decompose=True), expected)
+            self.assertEqual(network.check_network_intertwined(decompose=False), expected)
+
+
+class TestInterning(unittest.TestCase):
+    def test_ids(self):
+        inner = {'threshold' : 1, 'validators' : ['A','B'], 'innerQuorumSets' : []}
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : inner},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 2, 'validators' : ['C'], 'innerQuorumSets' : [inner]}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 2, 'validators' : ['C'], 'innerQuorumSets' : [inner]}}])
+        self.assertEqual(network.validator_ids, {'A' : 0, 'B' : 1, 'C' : 2})
+        # the qset of A is also the inner qset of the other two
+        self.assertEqual(len(network.qset_ids), 2)
+        self.assertEqual(list(network.validator_qsets), [0, 1, 1])
+        self.assertEqual(list(network.qset_thresholds), [1, 2])
+        self.assertEqual(list(network.qset_validators[0]), [0, 1])
+        self.assertEqual(list(network.qset_validators[1]), [2])
+        self.assertEqual(list(network.qset_inner[1]), [0])
+        self.assertEqual(network.symbol('B'), network.validator_symbols[1])
+
+
+class TestUpdate(unittest.TestCase):
+    def test_diff(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}])
+        validators = [
+            {'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','B'], 'innerQuorumSets' : []}},
+            {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['D'], 'innerQuorumSets' : []}}]
+        removed, changed = network.diff(validators)
+        self.assertEqual(removed, ['C'])
+        self.assertEqual([v['publicKey'] for v in changed], ['B','D'])
+        network.closed_ax()
+        updated = network.update(validators)
+        self.assertEqual(set(updated.validators), {'A','B','D'})
+        # A keeps its id and its qset, whose closure axioms are reused
+        self.assertEqual(updated.validator_ids['A'], network.validator_ids['A'])
+        a_qset = network.validator_qsets[network.validator_ids['A']]
+        self.assertIs(updated.lhs_cache[a_qset], network.lhs_cache[a_qset])
+
+    def test_incremental_checker(self):
+        snapshots = [
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}}],
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['B','D'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','D'], 'innerQuorumSets' : []}}],
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['B'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['B','D'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','D'], 'innerQuorumSets' : []}}],
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}}],
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}}]]
+        checker = stellar_network.IncrementalChecker(stellar_network.StellarNetwork(snapshots[0]))
+        self.assertTrue(checker.check_network_intertwined())
+        for validators in snapshots[1:]:
+            expected = stellar_network.StellarNetwork(validators).check_network_intertwined(decompose=False)
+            self.assertEqual(checker.update(validators), expected)
+
+    def test_bounded(self):
+        checker = stellar_network.IncrementalChecker(stellar_network.StellarNetwork(generators.tiered(4)))
+        self.assertTrue(checker.check_network_intertwined())
+        for i in range(12):
+            self.assertTrue(checker.update(generators.tiered(4 + i % 2, watchers=i)))
+            # the subformulas of earlier snapshots do not pile up
+            formula = checker.network.network_intertwined(checker.network.quorum_bearing_components()[0])
+            live, stale = checker.solver.usage(formula)
+            self.assertLessEqual(stale, checker.MAX_STALE_RATIO * live)
+
+
+class TestSymmetry(unittest.TestCase):
+    def test_classes(self):
+        network = stellar_network.StellarNetwork(
+            [{'publicKey' : 'A', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'B', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'C', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'D', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'E', 'quorumSet' : {'threshold' : 2, 'validators' : ['A','B','C'], 'innerQuorumSets' : []}},
+             {'publicKey' : 'F', 'quorumSet' : {'threshold' : 1, 'validators' : ['A','E'], 'innerQuorumSets' : []}}])
+        # A is trusted by F, unlike B and C
+        self.assertEqual(network.symmetry_classes(), [['A'], ['B','C'], ['D'], ['E'], ['F']])
+        self.assertEqual(len(network.representative_pairs()), 11)
+        self.assertEqual(network.symmetry_classes({'B','C','D'}), [['B','C'], ['D']])
+        self.assertEqual(network.representative_pairs({'B','C','D'}), [('B','D'), ('B','C')])
+
+    def test_same_verdicts(self):
+        for core_threshold, expected in [(1, False), (2, True), (3, True)]:
+            core = ['A','B','C','D']
+            network = stellar_network.StellarNetwork(
+                [{'publicKey' : v, 'quorumSet' : {'threshold' : core_threshold+1, 'validators' : core, 'innerQuorumSets' : []}} for v in core] +
+                [{'publicKey' : 'E', 'quorumSet' : {'threshold' : 1, 'validators' : [], 'innerQuorumSets' : [
+                    {'threshold' : core_threshold+1, 'validators' : core, 'innerQuorumSets' : []}]}}])
+            for decompose in [True, False]:
+                self.assertEqual(network.check_network_intertwined(decompose=decompose, symmetry=True), expected)
+                self.assertEqual(network.check_network_intertwined(decompose=decompose, symmetry=False), expected)
+
+class TestBudget(unittest.TestCase):
+    def test_unknown(self):
+        network = stellar_network.StellarNetwork(generators.tiered(4))
+        self.assertIs(network.check_network_intertwined(budget=budgets.Budget(0)), budgets.UNKNOWN)
+        self.assertIs(network.check_intertwined('O0V0', 'O1V0', budgets.Budget(0)), budgets.UNKNOWN)
+        self.assertIs(network.session().check_intertwined('O0V0', 'O1V0', budgets.Budget(0)), budgets.UNKNOWN)
+        self.assertTrue(network.check_network_intertwined(budget=budgets.Budget(60)))
+        for translation in ['cnf', 'pysmt']:
+            self.assertIs(tvl.is_valid(network.network_intertwined(), translation, budget=budgets.Budget(0)), budgets.UNKNOWN)
+            self.assertTrue(tvl.is_valid(network.network_intertwined(), translation, budget=budgets.Budget(60)))
+        with self.assertRaises(ValueError):
+            network.check_network_intertwined(max_workers=1, budget=budgets.Budget(60))
+
+    def test_within(self):
+        network = stellar_network.StellarNetwork(generators.tiered(4))
+        self.assertEqual(network.check_network_intertwined_within(budgets.Budget(60)), stellar_network.PartialResult(True))
+        result = network.check_network_intertwined_within(budgets.Budget(0))
+        self.assertIs(result.intertwined, budgets.UNKNOWN)
+        self.assertEqual(result.intertwined_pairs, [])
+        self.assertEqual(result.undecided_pairs, network.representative_pairs(set(network.validators)))
+        # without time for the full check, the pairs are checked one by one
+        result = network.check_network_intertwined_within(budgets.Budget(60), fraction=0)
+        self.assertTrue(result.intertwined)
+        self.assertEqual(result.intertwined_pairs, network.representative_pairs(set(network.validators)))
+        split = stellar_network.StellarNetwork(generators.symmetric_core(6, 3))
+        result = split.check_network_intertwined_within(budgets.Budget(60))
+        self.assertFalse(result.intertwined)
+        self.assertFalse(result.counterexample.quorums[0] & result.counterexample.quorums[1])
+        result = split.check_network_intertwined_within(budgets.Budget(60), fraction=0, precheck=False)
+        self.assertFalse(result.intertwined)
+        self.assertEqual(result.non_intertwined_pair, ('V0', 'V1'))
+
+    def test_encoding(self):
+        # a memory cap of 0 runs out at once, whatever the time taken by the encoding
+        network = stellar_network.StellarNetwork(generators.tiered(4))
+        with self.assertRaises(budgets.BudgetExceeded):
+            network.closed_ax(budget=budgets.Budget(memory_mb=0))
+        with self.assertRaises(budgets.BudgetExceeded):
+            tvl.ClauseEncoder().encode(network.network_intertwined(), budgets.Budget(memory_mb=0))
+        self.assertIs(network.check_network_intertwined(budget=budgets.Budget(memory_mb=0), precheck=False), budgets.UNKNOWN)
+        self.assertEqual(network.find_counterexample(budget=budgets.Budget(memory_mb=0)), (budgets.UNKNOWN, None))
+
+    def test_within_component(self):
+        # the watchers are outside the quorum-bearing component, so the pairs checked one by one are those of the component
+        network = stellar_network.StellarNetwork(generators.tiered(4, watchers=3))
+        component = network.quorum_bearing_components()[0]
+        result = network.check_network_intertwined_within(budgets.Budget(60), fraction=0)
+        self.assertTrue(result.intertwined)
+        self.assertEqual(result.intertwined_pairs, network.representative_pairs(component))
+        session = stellar_network.IntertwinedSession(network, component)
+        self.assertEqual(session.closed_ax, network.closed_ax(component))
+
+class TestPrecheck(unittest.TestCase):
+    def test_quorum_closure(self):
+        network = stellar_network.StellarNetwork(generators.tiered(4, watchers=4))
+        pks = sorted(network.validators)
+        for subset in [pks, pks[:6], pks[3:], pks[::2]]:
+            mask = sum([1 << network.validator_ids[pk] for pk in subset])
+            closure = network.quorum_closure(mask)
+            self.assertEqual(set([pk for pk in pks if closure >> network.validator_ids[pk] & 1]), network.max_quorum(subset))
+
+    def test_disjoint_quorums(self):
+        network = stellar_network.StellarNetwork(generators.symmetric_core(6, 3))
+        first, second = network.find_disjoint_quorums()
+        self.assertFalse(first & second)
+        for quorum in [first, second]:
+            self.assertTrue(quorum)
+            self.assertEqual(network.max_quorum(quorum), quorum)
+        self.assertIsNone(stellar_network.StellarNetwork(generators.tiered(4, watchers=4)).find_disjoint_quorums())
+
+    def test_same_verdicts(self):
+        for validators in [generators.symmetric_core(5), generators.symmetric_core(5, 2), generators.tiered(4, watchers=3), generators.split(3)]:
+            network = stellar_network.StellarNetwork(validators)
+            self.assertEqual(network.check_network_intertwined(precheck=True), network.check_network_intertwined(precheck=False))
+            self.assertEqual(network.check_network_intertwined(decompose=False, precheck=True), network.check_network_intertwined(decompose=False, precheck=False))
+
+class TestCounterexample(unittest.TestCase):
+    def assertCounterexample(self, network, counterexample):
+        p, q = counterexample.pair
+        first, second = counterexample.quorums
+        self.assertIn(p, first)
+        self.assertIn(q, second)
+        self.assertFalse(first & second)
+        for quorum in [first, second]:
+            self.assertEqual(network.max_quorum(quorum), quorum)
+        self.assertFalse(network.check_intertwined(p, q))
+
+    def test_model(self):
+        network = stellar_network.StellarNetwork(generators.symmetric_core(6, 3))
+        verdict, counterexample = network.find_counterexample(precheck=False)
+        self.assertFalse(verdict)
+        self.assertCounterexample(network, counterexample)
+        verdict, valuation = tvl.find_countermodel(network.network_intertwined())
+        self.assertFalse(verdict)
+        self.assertEqual(set(valuation.values()) - {'B'}, {'T', 'F'})
+
+    def test_other_sources(self):
+        for validators in [generators.split(3), generators.symmetric_core(6, 3), generators.split_tiered(4)]:
+            network = stellar_network.StellarNetwork(validators)
+            verdict, counterexample = network.find_counterexample()
+            self.assertFalse(verdict)
+            self.assertCounterexample(network, counterexample)
+        self.assertEqual(stellar_network.StellarNetwork(generators.tiered(4)).find_counterexample(), (True, None))
+        self.assertEqual(tvl.find_countermodel(tvl.Not(tvl.F)), (True, None))
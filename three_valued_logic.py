@@ -3,7 +3,11 @@ This files contains a prototype implementation of validity checking of a 3-value
 It is based on code written by Yoni Zohar (yoni.zohar@cs.tau.ac.il)
 """
 
+from array import array
 from pysmt.walkers import IdentityDagWalker
+import budgets
+import instrumentation
+import itertools
 import pysmt.shortcuts as ps
 
 AND = ps.Symbol("and", ps.FunctionType(ps.BOOL, [ps.BOOL, ps.BOOL]))
@@ -17,11 +21,37 @@ EQUIV = ps.Symbol("equiv", ps.FunctionType(ps.BOOL, [ps.BOOL, ps.BOOL]))
 # The constant F
 F = ps.Symbol("F", ps.BOOL)
 
-def And(x,y):
-  return ps.Function(AND, [x, y])
+# Conjunctions and disjunctions of more than two arguments are primitives too, with one symbol per arity, created on demand.
+# They are interpreted as the minimum, respectively maximum, of their arguments in the order F < B < T, like AND and OR.
+CONJUNCTIONS = {2: AND}
+DISJUNCTIONS = {2: OR}
+# Maps the symbols of all conjunctions and disjunctions to 'and', respectively 'or'
+NARY = {AND: 'and', OR: 'or'}
 
-def Or(x,y):
-  return ps.Function(OR, [x, y])
+def nary_connective(kind, arity):
+    connectives = CONJUNCTIONS if kind == 'and' else DISJUNCTIONS
+    if arity not in connectives:
+        connectives[arity] = ps.Symbol(kind + str(arity), ps.FunctionType(ps.BOOL, [ps.BOOL]*arity))
+        NARY[connectives[arity]] = kind
+    return connectives[arity]
+
+def And(*args):
+  """
+  The conjunction of one or more formulas, as a single n-ary node, so that long conjunctions do not produce deep formulas.
+  """
+  assert len(args) > 0
+  if len(args) == 1:
+      return args[0]
+  return ps.Function(nary_connective('and', len(args)), list(args))
+
+def Or(*args):
+  """
+  The disjunction of one or more formulas, as a single n-ary node.
+  """
+  assert len(args) > 0
+  if len(args) == 1:
+      return args[0]
+  return ps.Function(nary_connective('or', len(args)), list(args))
 
 def Not(x):
   return ps.Function(NOT, [x])
@@ -52,9 +82,17 @@ def Diamond(x):
 def B(x):
     return Diamond(x, Not(x))
 
+# Numbers the walkers, so that the numbered variables of different walkers are different pysmt symbols
+_walker_ids = itertools.count()
+
 class ExtendedIdentityDagWalker(IdentityDagWalker):
-    def __init__(self):
+    """
+    :param readable_names: if True, the variables of a subformula are named after the subformula, which is useful for debugging but takes time quadratic in the size of the formula; otherwise they are numbered, with a prefix unique to the walker, so that translations made by different walkers can be conjoined
+    """
+    def __init__(self, readable_names=False):
         IdentityDagWalker.__init__(self)
+        self.readable_names = readable_names
+        self.prefix = "#{}.".format(next(_walker_ids))
         self.subformulas_to_bools_TB = {}
         self.subformulas_to_bools_FB = {}
         self.constraints = set({})
@@ -77,8 +115,9 @@ class ExtendedIdentityDagWalker(IdentityDagWalker):
     def add_to_caches(self, formula):
         if formula not in self.subformulas_to_bools_TB:
             assert formula not in self.subformulas_to_bools_FB
-            self.subformulas_to_bools_TB[formula] = ps.Symbol("is_TB(" + str(formula) + ")")
-            self.subformulas_to_bools_FB[formula] = ps.Symbol("is_FB(" + str(formula) + ")")
+            name = str(formula) if self.readable_names else self.prefix + str(len(self.subformulas_to_bools_TB))
+            self.subformulas_to_bools_TB[formula] = ps.Symbol("is_TB(" + name + ")")
+            self.subformulas_to_bools_FB[formula] = ps.Symbol("is_FB(" + name + ")")
         assert formula in self.subformulas_to_bools_FB
         self.constraints.add(ps.Or(self.subformulas_to_bools_TB[formula], self.subformulas_to_bools_FB[formula]))
 
@@ -149,30 +188,417 @@ class ExtendedIdentityDagWalker(IdentityDagWalker):
             cell2 = ps.Implies(self.is_B(child), self.is_T(formula))
             cell3 = ps.Implies(self.is_F(child), self.is_F(formula))
             self.constraints.add(ps.And(cell1, cell2, cell3))
+        elif connective in NARY:
+            # a conjunction is designated iff all its arguments are, and anti-designated iff one of them is; dually for disjunctions
+            args = formula.args()
+            all_of, one_of = (ps.And, ps.Or) if NARY[connective] == 'and' else (ps.Or, ps.And)
+            tb = [self.subformulas_to_bools_TB[a] for a in args]
+            fb = [self.subformulas_to_bools_FB[a] for a in args]
+            self.constraints.add(ps.Iff(self.subformulas_to_bools_TB[formula], all_of(tb)))
+            self.constraints.add(ps.Iff(self.subformulas_to_bools_FB[formula], one_of(fb)))
+
+# Truth tables of the connectives other than conjunctions and disjunctions, indexed by the values of the arguments (in the order T, B, F)
+TABLES = {
+    EQUIV: ("TFF", "FTF", "FFT"),
+    NOT: "FBT",
+    DIAMOND: "TTF",
+}
+
+# How often long loops check their budget; checking the memory used reads /proc, so it is not done at every step
+CHECK_EVERY = 1024
+
+class ClauseEncoder:
+    """
+    Encodes the truth tables of the subformulas of a formula directly as integer clauses, without building pysmt terms.
+    Subformula number i is represented by the DIMACS variables 2i+1 (is_TB) and 2i+2 (is_FB).
+    Clauses are stored in DIMACS order in a flat array, each clause being terminated by 0.
+    """
+    def __init__(self):
+        self.subformulas_to_ids = {}
+        self.clauses = array('i')
+        self.num_clauses = 0
+
+    @property
+    def num_vars(self):
+        return 2*len(self.subformulas_to_ids)
+
+    def tb(self, x):
+        return 2*self.subformulas_to_ids[x]+1
+
+    def fb(self, x):
+        return 2*self.subformulas_to_ids[x]+2
+
+    def add_clause(self, lits):
+        self.clauses.extend(lits)
+        self.clauses.append(0)
+        self.num_clauses += 1
+
+    def add_gate(self, all_var, all_of, one_var, one_of):
+        """
+        Add the clauses stating that all_var holds iff all of all_of hold, and that one_var holds iff one of one_of holds.
+        This encodes a conjunction (the minimum of its arguments) or a disjunction (the maximum) with 2n+2 clauses, instead of the 18 clauses per binary node of its truth table.
+        """
+        for v in all_of:
+            self.add_clause([-all_var, v])
+        self.add_clause([all_var] + [-v for v in all_of])
+        for v in one_of:
+            self.add_clause([one_var, -v])
+        self.add_clause([-one_var] + list(one_of))
+
+    def negated_value(self, x, value):
+        """
+        The literals of a clause that is falsified exactly when x has the given value (assuming is_TB or is_FB holds).
+        """
+        if value == 'T':
+            return [self.fb(x)]
+        elif value == 'B':
+            return [-self.tb(x), -self.fb(x)]
+        else:
+            return [self.tb(x)]
+
+    def value(self, x, value):
+        """
+        The literals whose conjunction holds exactly when x has the given value.
+        """
+        return [self.tb(x) if value != 'F' else -self.tb(x), self.fb(x) if value != 'T' else -self.fb(x)]
+
+    def encode(self, formula, budget=None):
+        """
+        Add the clauses for all the subformulas of formula that have not been encoded yet.
+
+        :param budget: if not None, a budgets.Budget checked every CHECK_EVERY subformulas, raising budgets.BudgetExceeded when it runs out
+        """
+        stack = [(formula, False)]
+        steps = 0
+        while stack:
+            if budget is not None and steps % CHECK_EVERY == 0:
+                budget.check()
+            steps += 1
+            f, children_done = stack.pop()
+            if f in self.subformulas_to_ids:
+                continue
+            if f.is_symbol():
+                self.subformulas_to_ids[f] = len(self.subformulas_to_ids)
+                self.add_clause([self.tb(f), self.fb(f)])
+                if f == F:
+                    self.add_clause([-self.tb(f)])
+                    self.add_clause([self.fb(f)])
+            elif not children_done:
+                assert f.is_function_application()
+                stack.append((f, True))
+                stack.extend((a, False) for a in f.args() if a not in self.subformulas_to_ids)
+            else:
+                self.subformulas_to_ids[f] = len(self.subformulas_to_ids)
+                self.add_clause([self.tb(f), self.fb(f)])
+                args = f.args()
+                if f.function_name() in NARY:
+                    if NARY[f.function_name()] == 'and':
+                        self.add_gate(self.tb(f), [self.tb(a) for a in args], self.fb(f), [self.fb(a) for a in args])
+                    else:
+                        self.add_gate(self.fb(f), [self.fb(a) for a in args], self.tb(f), [self.tb(a) for a in args])
+                    continue
+                table = TABLES[f.function_name()]
+                if len(args) == 1:
+                    for v, result in zip("TBF", table):
+                        for lit in self.value(f, result):
+                            self.add_clause(self.negated_value(args[0], v) + [lit])
+                else:
+                    assert len(args) == 2
+                    for v1, row in zip("TBF", table):
+                        for v2, result in zip("TBF", row):
+                            for lit in self.value(f, result):
+                                self.add_clause(self.negated_value(args[0], v1) + self.negated_value(args[1], v2) + [lit])
+
+    def to_dimacs(self, extra_clauses=()):
+        """
+        Return the clauses, followed by extra_clauses (lists of literals), in DIMACS format.
+        """
+        lines = ["p cnf {} {}".format(self.num_vars, self.num_clauses + len(extra_clauses))]
+        lines.append(" ".join(map(str, self.clauses)).replace(" 0 ", " 0\n"))
+        lines.extend(" ".join(map(str, list(c) + [0])) for c in extra_clauses)
+        return "\n".join(lines) + "\n"
+
+def solve_dimacs(dimacs, budget=None):
+    """
+    Return True iff the given DIMACS instance is satisfiable.
+    The instance is handed to z3 as is, so no pysmt term is built.
+
+    :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if z3 runs out of it
+    """
+    import z3
+    with instrumentation.phase('solve'):
+        solver = z3.Solver()
+        if budget is not None:
+            solver.set(**budget.z3_params())
+        solver.from_string(dimacs)
+        result = solver.check()
+    if result == z3.unknown:
+        assert budget is not None
+        return budgets.UNKNOWN
+    return result == z3.sat
+
+def solve_dimacs_model(dimacs, budget=None):
+    """
+    Like solve_dimacs, but also return a satisfying assignment.
+
+    :return: a pair of the answer and, if the instance is satisfiable, the set of the variables that are true in a satisfying assignment (the others being false), or else None
+    """
+    import z3
+    with instrumentation.phase('solve'):
+        solver = z3.Solver()
+        if budget is not None:
+            solver.set(**budget.z3_params())
+        solver.from_string(dimacs)
+        result = solver.check()
+    if result == z3.unknown:
+        assert budget is not None
+        return budgets.UNKNOWN, None
+    if result == z3.unsat:
+        return False, None
+    # z3 names DIMACS variable i k!i, and leaves out the variables whose value does not matter
+    model = solver.model()
+    return True, set([int(d.name()[2:]) for d in model.decls() if d.name().startswith('k!') and z3.is_true(model[d])])
+
+def solve_model(dimacs, solver=None, budget=None):
+    """
+    Like solve, but also return a satisfying assignment (see solve_dimacs_model).
+    The backend must have a solve_model method; it is not silently replaced by another solver.
+    """
+    if solver is not None and not hasattr(solver, 'solve_model'):
+        raise TypeError("The backend {!r} cannot give models: it has no solve_model method".format(solver))
+    if budget is not None and budget.expired():
+        return budgets.UNKNOWN, None
+    if solver is None:
+        return solve_dimacs_model(dimacs, budget)
+    with instrumentation.phase('solve'):
+        return solver.solve_model(dimacs, budget=budget)
+
+def solve(dimacs, solver=None, budget=None):
+    """
+    Return True iff the DIMACS instance is satisfiable, according to solver (a backend from the solvers module) or, by default, to solve_dimacs.
+
+    :param budget: if not None, a budgets.Budget, passed on to the backend; budgets.UNKNOWN is returned if it runs out
+    """
+    if budget is not None and budget.expired():
+        return budgets.UNKNOWN
+    if solver is None:
+        return solve_dimacs(dimacs, budget)
+    with instrumentation.phase('solve'):
+        if budget is None:
+            return solver.solve(dimacs)
+        return solver.solve(dimacs, budget=budget)
 
-def encode_tables(formula):
-    walker = ExtendedIdentityDagWalker()
-    walker.walk(formula)
+class IncrementalSolver:
+    """
+    Checks the validity of many formulas with a single ClauseEncoder and a single z3 solver.
+    The truth-table clauses of a subformula are sent to the solver once and then shared by all later queries, together with whatever the solver learned from them.
+    This is sound because those clauses only define the value of a subformula in terms of the values of its arguments.
+    Queries are made under assumptions, so nothing has to be retracted afterwards.
+    """
+    def __init__(self):
+        import z3
+        self.encoder = ClauseEncoder()
+        self.solver = z3.SolverFor("QF_FD")
+        self.declared = 0  # number of variables declared in the solver
+        self.sent = 0  # number of entries of encoder.clauses already sent to the solver
+
+    def var(self, v):
+        import z3
+        return z3.Bool("v{}".format(v))
+
+    def add(self, formula, budget=None):
+        """
+        Encode formula and send its new clauses to the solver.
+        Clauses are sent as SMT-LIB text with named variables, which z3 parses much faster than it builds terms through its Python API.
+
+        :param budget: if not None, a budgets.Budget; budgets.BudgetExceeded is raised if it runs out while encoding
+        """
+        self.encoder.encode(formula, budget)
+        if self.sent == len(self.encoder.clauses):
+            return
+        lines = ["(declare-const v{} Bool)".format(v) for v in range(self.declared+1, self.encoder.num_vars+1)]
+        clause = []
+        for lit in self.encoder.clauses[self.sent:]:
+            if lit == 0:
+                lines.append("(assert (or {}))".format(" ".join(clause)))
+                clause = []
+            else:
+                clause.append("v{}".format(lit) if lit > 0 else "(not v{})".format(-lit))
+        self.solver.from_string("\n".join(lines))
+        self.declared = self.encoder.num_vars
+        self.sent = len(self.encoder.clauses)
+
+    def usage(self, formula):
+        """
+        Return a pair of the numbers of encoded subformulas that are, respectively are not, subformulas of formula.
+        When formula is the only one still queried, the clauses of the latter only take up memory.
+        """
+        live = set()
+        stack = [formula]
+        while stack:
+            f = stack.pop()
+            if f not in live and f in self.encoder.subformulas_to_ids:
+                live.add(f)
+                stack.extend(f.args())
+        return len(live), len(self.encoder.subformulas_to_ids) - len(live)
+
+    def is_valid(self, formula, budget=None):
+        """
+        :param budget: if not None, a budgets.Budget for encoding and solving; budgets.UNKNOWN is returned if it runs out
+        """
+        import z3
+        try:
+            self.add(formula, budget)
+        except budgets.BudgetExceeded:
+            return budgets.UNKNOWN
+        # the parameters stay set in the solver, so they are reset for queries without a budget
+        self.solver.set(**(budget or budgets.Budget()).z3_params())
+        result = self.solver.check(z3.Not(self.var(self.encoder.tb(formula))))
+        if result == z3.unknown:
+            assert budget is not None
+            return budgets.UNKNOWN
+        return result == z3.unsat
+
+def encode_tables(formula, readable_names=False):
+    walker = ExtendedIdentityDagWalker(readable_names)
+    with instrumentation.phase('translation'):
+        walker.walk(formula)
+    instrumentation.count('subformulas', len(walker.subformulas_to_bools_TB))
+    instrumentation.count('variables', 2*len(walker.subformulas_to_bools_TB))
+    instrumentation.count('constraints', len(walker.constraints))
     return walker.constraints, walker.subformulas_to_bools_TB, walker.subformulas_to_bools_FB
 
-def translate_for_validity(formula):
+def translate_for_validity(formula, readable_names=False):
     """
     Translate a formula in three-valued logic to a formula in classical logic that is valid iff the original formula is valid.
     """
-    constraints, subformulas_to_bools_TB, _ = encode_tables(formula)
+    constraints, subformulas_to_bools_TB, _ = encode_tables(formula, readable_names)
     return ps.Implies(ps.And([c for c in constraints]), subformulas_to_bools_TB[formula])
 
-def is_valid(formula):
-    return ps.is_valid(translate_for_validity(formula))
-    # with ps.Solver(name="btor") as solver:
-    #     return solver.is_valid(translate_for_validity(formula))
+def validity_dimacs(formula):
+    """
+    Return a DIMACS instance that is unsatisfiable iff the formula is valid.
+    """
+    return encode_clauses(formula, -1)
 
-def translate_for_satisfiability(formula):
+def satisfiability_dimacs(formula):
+    """
+    Return a DIMACS instance that is satisfiable iff the formula is satisfiable.
+    """
+    return encode_clauses(formula, 1)
+
+def encode_clauses(formula, polarity, budget=None):
+    """
+    Return the DIMACS instance made of the truth-table clauses of formula and of the unit clause stating that formula is designated (polarity 1) or not (polarity -1).
+
+    :param budget: if not None, a budgets.Budget; budgets.BudgetExceeded is raised if it runs out
+    """
+    return encode_clauses_with_encoder(formula, polarity, budget)[1]
+
+def encode_clauses_with_encoder(formula, polarity, budget=None):
+    """
+    Like encode_clauses, but return a pair of the ClauseEncoder and the DIMACS instance, so that models can be decoded (see valuation).
+    """
+    with instrumentation.phase('translation'):
+        encoder = ClauseEncoder()
+        encoder.encode(formula, budget)
+        dimacs = encoder.to_dimacs([[polarity*encoder.tb(formula)]])
+    instrumentation.count('subformulas', len(encoder.subformulas_to_ids))
+    instrumentation.count('variables', encoder.num_vars)
+    instrumentation.count('constraints', encoder.num_clauses + 1)
+    return encoder, dimacs
+
+def valuation(encoder, model):
+    """
+    Decode a model of the clauses of encoder into the three-valued valuation of the symbols it encoded.
+
+    :param model: the set of the DIMACS variables that are true
+    :return: a dictionary mapping each symbol, except F, to 'T', 'B' or 'F'
+    """
+    values = dict()
+    for x in encoder.subformulas_to_ids:
+        if x.is_symbol() and x != F:
+            tb, fb = encoder.tb(x) in model, encoder.fb(x) in model
+            values[x] = 'B' if tb and fb else ('T' if tb else 'F')
+    return values
+
+def find_countermodel(formula, solver=None, budget=None):
+    """
+    Check the validity of formula with the clause encoding, keeping the model found by the solver when formula is not valid.
+
+    :param solver: a backend from the solvers module (see solve_model); defaults to the z3 Python API
+    :param budget: if not None, a budgets.Budget; budgets.UNKNOWN is returned if it runs out
+    :return: a pair of the answer of is_valid and, if formula is not valid, a valuation of its symbols (see valuation) in which it is F, or else None
+    """
+    try:
+        encoder, dimacs = encode_clauses_with_encoder(formula, -1, budget)
+    except budgets.BudgetExceeded:
+        return budgets.UNKNOWN, None
+    sat, model = solve_model(dimacs, solver, budget)
+    if sat is budgets.UNKNOWN:
+        return budgets.UNKNOWN, None
+    if not sat:
+        return True, None
+    return False, valuation(encoder, model)
+
+def is_valid(formula, translation='cnf', solver=None, budget=None):
+    """
+    :param translation: 'cnf' to emit integer clauses directly, or 'pysmt' to build a pysmt formula with translate_for_validity
+    :param solver: with the 'cnf' translation, a backend from the solvers module; defaults to the z3 Python API
+    :param budget: if not None, a budgets.Budget for the whole query; budgets.UNKNOWN is returned if it runs out
+    """
+    if budget is not None and budget.expired():
+        return budgets.UNKNOWN
+    if translation == 'cnf':
+        try:
+            dimacs = encode_clauses(formula, -1, budget)
+        except budgets.BudgetExceeded:
+            return budgets.UNKNOWN
+        sat = solve(dimacs, solver, budget)
+        return budgets.UNKNOWN if sat is budgets.UNKNOWN else not sat
+    # the pysmt walker cannot be interrupted, so the budget is only checked after it
+    classical = translate_for_validity(formula)
+    with instrumentation.phase('solve'):
+        if budget is None:
+            return ps.is_valid(classical)
+        sat = solve_pysmt(ps.Not(classical), budget)
+    return budgets.UNKNOWN if sat is budgets.UNKNOWN else not sat
+
+def translate_for_satisfiability(formula, readable_names=False):
     """
     Translate a formula in three-valued logic to a formula in classical logic that is satisfiable iff the original formula is satisfiable.
     """
-    constraints, subformulas_to_bools_TB, _ = encode_tables(formula)
+    constraints, subformulas_to_bools_TB, _ = encode_tables(formula, readable_names)
     return ps.And([c for c in constraints] + [subformulas_to_bools_TB[formula]])
 
-def is_sat(formula):
-    return ps.is_sat(translate_for_satisfiability(formula))
\ No newline at end of file
+def is_sat(formula, translation='cnf', solver=None, budget=None):
+    """
+    :param translation: 'cnf' to emit integer clauses directly, or 'pysmt' to build a pysmt formula with translate_for_satisfiability
+    :param solver: with the 'cnf' translation, a backend from the solvers module; defaults to the z3 Python API
+    :param budget: if not None, a budgets.Budget for the whole query; budgets.UNKNOWN is returned if it runs out
+    """
+    if budget is not None and budget.expired():
+        return budgets.UNKNOWN
+    if translation == 'cnf':
+        try:
+            dimacs = encode_clauses(formula, 1, budget)
+        except budgets.BudgetExceeded:
+            return budgets.UNKNOWN
+        return solve(dimacs, solver, budget)
+    # the pysmt walker cannot be interrupted, so the budget is only checked after it
+    classical = translate_for_satisfiability(formula)
+    with instrumentation.phase('solve'):
+        if budget is None:
+            return ps.is_sat(classical)
+        return solve_pysmt(classical, budget)
+
+def solve_pysmt(formula, budget):
+    """
+    Return True iff the classical formula is satisfiable, or budgets.UNKNOWN if z3 runs out of budget.
+    """
+    from pysmt.exceptions import SolverReturnedUnknownResultError
+    with ps.Solver(name='z3', solver_options=budget.z3_params()) as solver:
+        try:
+            return solver.is_sat(formula)
+        except SolverReturnedUnknownResultError:
+            return budgets.UNKNOWN
@@ -36,4 +36,61 @@ class TestThreeValuedLogic(unittest.TestCase):
         s = ps.Symbol("s")
         ClosedAx3 = And(Dimp(r,p), And(Dimp(Not(r),Not(p)), And(Dimp(s,q), Dimp(Not(s),Not(q)))))
         formula = Dimp(ClosedAx3, Or(And(p,q),And(Not(p),Not(q))))
-        self.assertFalse(is_valid(formula))
\ No newline at end of file
+        self.assertFalse(is_valid(formula))
+
+
+class TestTranslations(unittest.TestCase):
+    def test_same_verdicts(self):
+        """
+        The clause encoder and the pysmt translation agree on validity and satisfiability.
+        """
+        p = ps.Symbol("p")
+        q = ps.Symbol("q")
+        formulas = [F, Not(F), p, Not(p), Or(p, Not(p)), And(p, Not(p)), Box(p), Diamond(p), Equiv(p, p), Equiv(p, Not(p)),
+                    Dimp(And(p, q), p), Cimp(p, q), Ciff(p, Not(Not(p))), Diff(p, q), Dimp(p, F)]
+        for formula in formulas:
+            self.assertEqual(is_valid(formula, translation='cnf'), is_valid(formula, translation='pysmt'))
+            self.assertEqual(is_sat(formula, translation='cnf'), is_sat(formula, translation='pysmt'))
+
+    def test_clause_encoder(self):
+        p = ps.Symbol("p")
+        encoder = ClauseEncoder()
+        encoder.encode(And(p, Not(p)))
+        # p, not(p), and(p, not(p))
+        self.assertEqual(encoder.num_vars, 6)
+        self.assertEqual(encoder.clauses.count(0), encoder.num_clauses)
+        self.assertTrue(encoder.to_dimacs().startswith("p cnf 6 {}\n".format(encoder.num_clauses)))
+
+class TestWalker(unittest.TestCase):
+    def test_names(self):
+        p = ps.Symbol("p")
+        _, tb, fb = encode_tables(Not(p))
+        self.assertRegex(tb[p].symbol_name(), r"^is_TB\(#\d+\.0\)$")
+        self.assertRegex(fb[Not(p)].symbol_name(), r"^is_FB\(#\d+\.1\)$")
+        # another walker numbers its variables differently, so that the two translations can be conjoined
+        q = ps.Symbol("q")
+        _, other_tb, _ = encode_tables(Not(q))
+        self.assertNotEqual(other_tb[q], tb[p])
+        self.assertTrue(ps.is_sat(ps.And(translate_for_satisfiability(p), translate_for_satisfiability(Not(Diamond(q))))))
+        _, tb, _ = encode_tables(Not(p), readable_names=True)
+        self.assertEqual(tb[Not(p)].symbol_name(), "is_TB(" + str(Not(p)) + ")")
+        self.assertTrue(is_valid(Or(p, Not(p)), translation='pysmt'))
+
+class TestNary(unittest.TestCase):
+    def test_nested(self):
+        """
+        n-ary conjunctions and disjunctions have the same values as nested binary ones.
+        """
+        p = ps.Symbol("p")
+        q = ps.Symbol("q")
+        r = ps.Symbol("r")
+        for translation in ['cnf', 'pysmt']:
+            self.assertTrue(is_valid(Equiv(And(p, q, Not(r)), And(p, And(q, Not(r)))), translation=translation))
+            self.assertTrue(is_valid(Equiv(Or(p, Not(q), r), Or(Or(p, Not(q)), r)), translation=translation))
+            self.assertFalse(is_valid(Equiv(And(p, q, r), Or(p, q, r)), translation=translation))
+            self.assertTrue(is_valid(Dimp(And(p, q, r), Or(r, Not(p), F)), translation=translation))
+
+    def test_arity(self):
+        p = ps.Symbol("p")
+        self.assertEqual(And(p), p)
+        self.assertEqual(len(And(*[Not(p)]*5).args()), 5)